@@ -0,0 +1,122 @@
+"""
+Parsing Benchmark
+Times the fetch -> filter pipeline's parsing step on a recorded /screener/process
+response: standard json + pd.DataFrame(records) versus the typed and fast paths.
+
+Usage:
+    python benchmark_parsing.py --record response.json   # save a live full-market response
+    python benchmark_parsing.py response.json            # benchmark a recorded response
+    python benchmark_parsing.py                          # no recording: synthetic 5000-stock response
+"""
+
+import json
+import random
+import sys
+import time
+import pandas as pd
+import requests
+import chartink_client
+from chartink_client import COMBINED_CLAUSE, gainers_url, records_to_frame, orjson, pa
+from csrf_cache import CsrfTokenCache, DEFAULT_CACHE_FILE
+from stock_ranking import split_by_index
+from symbol_index import load_index_membership
+
+# Timed runs per parser (best run is reported)
+REPEAT = 20
+
+# Size of the synthetic response when no recording is given
+SYNTHETIC_STOCKS = 5000
+
+
+def record_response(output_file):
+    """Save the raw body of a live COMBINED_CLAUSE response (all stocks with open = high or open = low)"""
+    token_cache = CsrfTokenCache(cache_file=DEFAULT_CACHE_FILE)
+    with requests.session() as s:
+        response = token_cache.post(s, gainers_url, COMBINED_CLAUSE, timeout=30)
+    if response is None or response.status_code != 200:
+        print(f"[ERROR] Could not record a response (status: {getattr(response, 'status_code', None)})")
+        return False
+    with open(output_file, "wb") as f:
+        f.write(response.content)
+    print(f"[OK] Recorded {len(response.content):,} bytes to {output_file}")
+    return True
+
+
+def synthetic_response(count=SYNTHETIC_STOCKS):
+    """Build a response body shaped like Chartink's, for when nothing is recorded"""
+    rng = random.Random(42)
+    records = []
+    for sr in range(1, count + 1):
+        close = round(rng.uniform(10, 20000), 2)
+        records.append({
+            "sr": sr,
+            "nsecode": f"SYM{sr:05d}",
+            "name": f"Company {sr} Limited",
+            "bsecode": str(500000 + sr) if rng.random() > 0.1 else None,
+            "per_chg": round(rng.uniform(-10, 10), 2),
+            "close": close,
+            "volume": rng.randint(1000, 50000000),
+        })
+    return json.dumps({"draw": 1, "recordsTotal": count, "recordsFiltered": count, "data": records}).encode("utf-8")
+
+
+def best_time(fn, repeat=REPEAT):
+    """Best wall-clock time of fn() over `repeat` runs, and its last result"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--record"]:
+        if len(args) < 2:
+            print(__doc__)
+            return
+        record_response(args[1])
+        return
+
+    if args:
+        with open(args[0], "rb") as f:
+            body = f.read()
+        source = args[0]
+    else:
+        body = synthetic_response()
+        source = f"synthetic ({SYNTHETIC_STOCKS} stocks)"
+
+    print(f"Response: {source}, {len(body):,} bytes")
+    print(f"orjson: {'yes' if orjson is not None else 'not installed'} | pyarrow: {'yes' if pa is not None else 'not installed'}\n")
+
+    parsers = [
+        ("json + pd.DataFrame(records)", lambda: pd.DataFrame(json.loads(body)["data"])),
+        ("json + typed NumPy columns", lambda: records_to_frame(json.loads(body)["data"], arrow=False)),
+    ]
+    if orjson is not None:
+        parsers.append(("orjson + typed NumPy columns", lambda: records_to_frame(orjson.loads(body)["data"], arrow=False)))
+    if pa is not None:
+        loads = orjson.loads if orjson is not None else json.loads
+        label = "orjson" if orjson is not None else "json"
+        parsers.append((f"{label} + Arrow-backed columns", lambda: records_to_frame(loads(body)["data"], arrow=True)))
+
+    membership = load_index_membership({"Nifty 100": "ind_nifty100list.csv"})
+
+    print(f"{'Parser':<32} {'Parse (ms)':>11} {'Filter (ms)':>12} {'Memory (KB)':>12}")
+    baseline = None
+    for label, parse in parsers:
+        parse_time, frame = best_time(parse)
+        filter_time, _ = best_time(lambda: split_by_index(frame, membership))
+        memory = frame.memory_usage(deep=True).sum() / 1024
+        baseline = baseline or parse_time
+        print(f"{label:<32} {parse_time * 1000:>11.2f} {filter_time * 1000:>12.2f} {memory:>12,.0f}   ({baseline / parse_time:.1f}x)")
+
+    print(f"\n[INFO] Pipeline default: fast JSON {'on' if orjson is not None and chartink_client.USE_FAST_JSON else 'off'}, "
+          f"Arrow dtypes {'on' if chartink_client.arrow_enabled() else 'off'}")
+
+
+if __name__ == "__main__":
+    main()
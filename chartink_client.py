@@ -0,0 +1,430 @@
+"""
+Chartink API Client
+Shared helpers for fetching the open=high / open=low screeners from Chartink
+"""
+
+import asyncio
+import re
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup as bs
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+# Optional fast paths - everything falls back to json / NumPy dtypes without them
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# API endpoint for processing the screener
+api_url = "https://chartink.com/screener/process"
+
+# URLs for gainers (Open = High) and losers (Open = Low)
+gainers_url = "https://chartink.com/screener/copy-open-high-5911"
+losers_url = "https://chartink.com/screener/copy-open-low-103152"
+
+# Scan clauses for each flow
+GAINERS_CLAUSE = "( latest open = latest high )"
+LOSERS_CLAUSE = "( latest open = latest low )"
+
+# Single clause covering both flows (split locally by split_combined_result)
+COMBINED_CLAUSE = f"( {GAINERS_CLAUSE} or {LOSERS_CLAUSE} )"
+
+# Set once a combined scan comes back without open/high/low, so later fetches in
+# this process go straight to the separate scans instead of repeating the wasted POST
+_combined_unsupported = False
+
+# Browser-like headers Chartink expects on every request
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Referer': 'https://chartink.com/',
+    'Origin': 'https://chartink.com',
+    'Accept': 'application/json, text/javascript, */*; q=0.01'
+}
+
+# Connections kept open to chartink.com by a pooled session
+DEFAULT_POOL_SIZE = 10
+
+# Columns kept from /screener/process records and the dtype each is converted to
+# (None keeps what pandas parses). Prices stay float64: float32 holds only ~7
+# significant digits, so 9000.10 would come back as 9000.0996. % change (always
+# well below 1,000) fits float32 exactly to 4 decimals. Symbols and names are
+# unique per response, so categoricals would only add a codes array on top.
+STOCK_COLUMN_DTYPES = {
+    'sr': 'int64',
+    'nsecode': None,
+    'name': None,
+    'bsecode': None,
+    'per_chg': 'float32',
+    'close': 'float64',
+    'volume': 'int64',
+    # Needed to split COMBINED_CLAUSE results
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+}
+
+# Use orjson / Arrow-backed dtypes when they are installed (set False to force the plain path)
+USE_FAST_JSON = True
+USE_ARROW_DTYPES = True
+
+# Arrow type used for each STOCK_COLUMN_DTYPES dtype on the Arrow path
+_ARROW_TYPES = {
+    'float32': 'float32',
+    'float64': 'float64',
+    'int64': 'int64',
+}
+
+
+# Patterns for pulling <meta name="csrf-token" content="..."> out of a partial page
+_META_TAG_RE = re.compile(rb"<meta\b[^>]*>", re.IGNORECASE)
+_CSRF_NAME_RE = re.compile(rb"""name\s*=\s*["']csrf-token["']""", re.IGNORECASE)
+_CONTENT_RE = re.compile(rb"""content\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+_HEAD_END_RE = re.compile(rb"</head\s*>", re.IGNORECASE)
+
+# Bytes re-scanned from the previous chunk, so a tag split across chunks is still found
+_CHUNK_OVERLAP = 1024
+
+
+def _find_csrf_meta(buffer, start=0):
+    """Return the csrf-token meta content found in buffer[start:], or None"""
+    for match in _META_TAG_RE.finditer(buffer, start):
+        tag = match.group(0)
+        if _CSRF_NAME_RE.search(tag):
+            content = _CONTENT_RE.search(tag)
+            if content:
+                return bytes(content.group(1)).decode("utf-8", "replace")
+    return None
+
+
+def get_csrf_token(session, screener_url, timeout=30, chunk_size=8192):
+    """
+    Fetch the CSRF token from a screener page
+
+    The page is streamed and scanned chunk by chunk; reading stops as soon as
+    the csrf-token meta tag is seen. Only if the tag is not in the <head> is
+    the rest of the page downloaded and parsed with BeautifulSoup.
+
+    Args:
+        session: requests session (cookies are stored on it)
+        screener_url: Chartink screener URL
+        timeout: Request timeout in seconds
+        chunk_size: Bytes read per chunk (default: 8192)
+
+    Returns:
+        str: CSRF token or None
+    """
+    response = session.get(screener_url, timeout=timeout, stream=True)
+    buffer = bytearray()
+    try:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            scan_from = max(0, len(buffer) - _CHUNK_OVERLAP)
+            buffer += chunk
+            token = _find_csrf_meta(buffer, scan_from)
+            if token:
+                return token
+            if _HEAD_END_RE.search(buffer, scan_from):
+                break
+
+        # Tag not in <head> - read the remainder and fall back to a full parse
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            buffer += chunk
+    finally:
+        # Closing early drops the connection instead of draining the unread body
+        response.close()
+
+    soup = bs(bytes(buffer), "lxml")
+    meta = soup.find("meta", {"name": "csrf-token"})
+    if meta and meta.get("content"):
+        return meta["content"]
+    return None
+
+
+def create_pooled_session(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Create a keep-alive session with a bounded connection pool for chartink.com
+
+    The session is meant to be shared across threads (e.g. every Streamlit
+    rerun), so requests reuse warm TCP/TLS connections. When the pool is full,
+    callers wait for a free connection instead of opening new ones.
+
+    Args:
+        pool_size: Maximum connections kept per host (default: DEFAULT_POOL_SIZE)
+
+    Returns:
+        requests.Session: Configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(BROWSER_HEADERS)
+    # gzip/deflate always; br (and zstd) only when urllib3 can decode them
+    session.headers.update({
+        'Accept-Encoding': ACCEPT_ENCODING,
+        'Connection': 'keep-alive'
+    })
+    return session
+
+
+def post_scan_clause(session, csrf_token, scan_clause, timeout=30):
+    """
+    POST a scan clause to the Chartink screener API
+
+    Args:
+        session: requests session holding the Chartink cookies
+        csrf_token: CSRF token from the screener page
+        scan_clause: Chartink scan clause
+        timeout: Request timeout in seconds
+
+    Returns:
+        requests.Response: Raw API response
+    """
+    header = {"x-csrf-token": csrf_token}
+    return session.post(api_url, headers=header, data={"scan_clause": scan_clause}, timeout=timeout)
+
+
+def response_json(response):
+    """Decode a response body, with orjson when it is installed"""
+    if orjson is not None and USE_FAST_JSON:
+        return orjson.loads(response.content)
+    return response.json()
+
+
+def arrow_enabled():
+    """Whether records_to_frame builds Arrow-backed frames"""
+    return pa is not None and USE_ARROW_DTYPES
+
+
+def _kept_columns(names, column_dtypes):
+    """Columns to keep: column_dtypes' columns for Chartink's usual layout, else everything"""
+    if 'nsecode' in names and 'per_chg' in names:
+        return [name for name in names if name in column_dtypes]
+    return list(names)
+
+
+def _arrow_frame(records, column_dtypes):
+    """Build the frame in Arrow: one C-level pass over the records, then per-column casts"""
+    table = pa.Table.from_struct_array(pa.array(records))
+    columns = {}
+    for name in _kept_columns(table.column_names, column_dtypes):
+        column = table.column(name)
+        dtype = column_dtypes.get(name)
+        if dtype:
+            column = column.cast(_ARROW_TYPES[dtype], safe=False)
+        columns[name] = pd.array(column, dtype=pd.ArrowDtype(column.type))
+    return pd.DataFrame(columns)
+
+
+def _coerce_column(column, dtype):
+    """Convert one column that did not cast cleanly (stray strings / gaps) to dtype"""
+    numbers = pd.to_numeric(column, errors='coerce')
+    if dtype == 'int64':
+        # Nullable integers only when the column actually has gaps
+        return numbers.astype('Int64' if numbers.isna().any() else 'int64')
+    return numbers.astype(dtype)
+
+
+def records_to_frame(records, column_dtypes=STOCK_COLUMN_DTYPES, arrow=None):
+    """
+    Build a typed, columnar DataFrame from /screener/process records
+
+    The frame is built by pandas in one step; only columns that didn't parse
+    as their dtype (float32 % change, float64 prices, int64 volume) are cast,
+    and a column holding values that don't cast cleanly is coerced. When the records
+    have Chartink's usual nsecode/per_chg layout, columns not in column_dtypes
+    are dropped; any other layout is kept whole so resolve_schema can still
+    guess it.
+
+    With pyarrow installed (see arrow_enabled) the columns are Arrow-backed
+    (string symbols/names, float32 % change, float64 prices, int64 volume, all
+    nullable); if Arrow can't convert the records, the NumPy path is used instead.
+
+    Args:
+        records: List of dicts (or positional lists) from the "data" key
+        column_dtypes: {column: dtype} to keep and convert (default: STOCK_COLUMN_DTYPES)
+        arrow: Build Arrow-backed columns (default: None, use arrow_enabled())
+
+    Returns:
+        pd.DataFrame: Typed frame (empty if there are no records)
+    """
+    if not records:
+        return pd.DataFrame()
+
+    if not all(isinstance(record, dict) for record in records):
+        # Positional rows have no column names - number them
+        records = [
+            record if isinstance(record, dict) else {f"Column_{idx + 1}": value for idx, value in enumerate(record)}
+            for record in records
+            if isinstance(record, (dict, list, tuple))
+        ]
+
+    if arrow is None:
+        arrow = arrow_enabled()
+    if arrow and records:
+        try:
+            return _arrow_frame(records, column_dtypes)
+        except (pa.ArrowException, TypeError, ValueError):
+            # Mixed value types Arrow can't reconcile - use the NumPy path
+            pass
+
+    frame = pd.DataFrame(records)
+    names = _kept_columns(list(frame.columns), column_dtypes)
+    if len(names) < len(frame.columns):
+        frame = frame[names]
+    # Only columns pandas didn't already parse as the wanted dtype are cast
+    dtypes = {
+        name: column_dtypes[name] for name in names
+        if column_dtypes.get(name) and frame[name].dtype != column_dtypes[name]
+    }
+    if not dtypes:
+        return frame
+    # assign() replaces just the cast columns; astype on the frame would copy them all
+    converted = {}
+    for name, dtype in dtypes.items():
+        try:
+            converted[name] = frame[name].astype(dtype)
+        except (TypeError, ValueError):
+            converted[name] = _coerce_column(frame[name], dtype)
+    return frame.assign(**converted)
+
+
+def response_to_dataframe(response):
+    """
+    Convert a /screener/process response into a typed DataFrame
+
+    Returns:
+        pd.DataFrame: Typed stocks (empty when the screen matched nothing), or
+                      None if the request failed (the status is printed)
+    """
+    if response is None:
+        print("   [ERROR] No response from Chartink")
+        return None
+    if response.status_code != 200:
+        print(f"   [ERROR] API returned status code {response.status_code}")
+        return None
+    data = response_json(response)
+    if "data" in data and len(data["data"]) > 0:
+        return records_to_frame(data["data"])
+    return pd.DataFrame()
+
+
+def split_combined_result(stock_list):
+    """
+    Split a COMBINED_CLAUSE result into gainers (open = high) and losers (open = low)
+
+    A stock with open = high = low appears in both lists, exactly as it would
+    with two separate scans.
+
+    Args:
+        stock_list: DataFrame returned for COMBINED_CLAUSE
+
+    Returns:
+        tuple: (gainers_df, losers_df), or None if the result has no open/high/low columns
+    """
+    if stock_list.empty:
+        return pd.DataFrame(), pd.DataFrame()
+
+    columns = {str(col).lower(): col for col in stock_list.columns}
+    if not all(key in columns for key in ("open", "high", "low")):
+        return None
+
+    open_price = pd.to_numeric(stock_list[columns["open"]], errors="coerce")
+    high_price = pd.to_numeric(stock_list[columns["high"]], errors="coerce")
+    low_price = pd.to_numeric(stock_list[columns["low"]], errors="coerce")
+
+    gainers_df = stock_list[open_price == high_price].reset_index(drop=True)
+    losers_df = stock_list[open_price == low_price].reset_index(drop=True)
+    return gainers_df, losers_df
+
+
+class AsyncChartinkClient:
+    def __init__(self, session=None, timeout=30, token_cache=None, combined=False):
+        """
+        Asyncio-based Chartink client that runs the screener POSTs concurrently
+
+        Requests are issued on worker threads so the blocking requests session
+        (and its cookie jar) is shared with the rest of the code.
+
+        Args:
+            session: requests session to use (default: None, creates one)
+            timeout: Request timeout in seconds (default: 30)
+            token_cache: CsrfTokenCache to reuse tokens across runs (default: None, always fetch)
+            combined: Send one COMBINED_CLAUSE POST instead of two (default: False)
+        """
+        self.session = session if session is not None else requests.Session()
+        self.timeout = timeout
+        self.token_cache = token_cache
+        self.combined = combined
+
+    async def fetch_token(self, screener_url=gainers_url):
+        """Fetch the CSRF token without blocking the event loop"""
+        if self.token_cache is not None:
+            return await asyncio.to_thread(self.token_cache.get_token, self.session, screener_url, self.timeout)
+        return await asyncio.to_thread(get_csrf_token, self.session, screener_url, self.timeout)
+
+    async def fetch_clause(self, csrf_token, scan_clause, screener_url=gainers_url):
+        """POST one scan clause and return the result as a DataFrame (None if the request failed)"""
+        response = await asyncio.to_thread(post_scan_clause, self.session, csrf_token, scan_clause, self.timeout)
+        if response.status_code == 419 and self.token_cache is not None:
+            # Token expired server-side - refresh once (shared with the concurrent request)
+            csrf_token = await asyncio.to_thread(
+                self.token_cache.refresh, self.session, screener_url, csrf_token, self.timeout
+            )
+            if csrf_token:
+                response = await asyncio.to_thread(post_scan_clause, self.session, csrf_token, scan_clause, self.timeout)
+        return response_to_dataframe(response)
+
+    async def fetch_gainers_losers(self, screener_url=gainers_url):
+        """
+        Fetch gainers and losers concurrently using one shared CSRF token
+
+        In combined mode a single POST is sent and split locally, so both lists
+        come from the same market snapshot. If the response has no open/high/low
+        columns to split on, the two separate scans are used instead, and every
+        later fetch in the same process skips the combined POST. A failed
+        combined request also falls back to the separate scans, for this fetch only.
+
+        Returns:
+            tuple: (gainers_df, losers_df) - an empty frame when a screen matched
+                   nothing, None for a list whose request failed
+        """
+        csrf_token = await self.fetch_token(screener_url)
+        if not csrf_token:
+            print("   [ERROR] Could not get a CSRF token from Chartink")
+            return None, None
+
+        global _combined_unsupported
+        if self.combined and not _combined_unsupported:
+            combined_df = await self.fetch_clause(csrf_token, COMBINED_CLAUSE, screener_url)
+            if combined_df is None:
+                print("   [WARNING] Combined scan failed - trying the separate scans")
+            else:
+                split = split_combined_result(combined_df)
+                if split is not None:
+                    return split
+                print("   [WARNING] Combined scan has no open/high/low columns - using separate scans from now on")
+                _combined_unsupported = True
+
+        gainers_df, losers_df = await asyncio.gather(
+            self.fetch_clause(csrf_token, GAINERS_CLAUSE, screener_url),
+            self.fetch_clause(csrf_token, LOSERS_CLAUSE, screener_url),
+        )
+        return gainers_df, losers_df
+
+
+def fetch_gainers_losers(session=None, timeout=30, token_cache=None, combined=False):
+    """
+    Blocking entry point for scripts: fetch both screeners in one cycle
+
+    Returns:
+        tuple: (gainers_df, losers_df), None for a list whose request failed
+    """
+    client = AsyncChartinkClient(session=session, timeout=timeout, token_cache=token_cache, combined=combined)
+    return asyncio.run(client.fetch_gainers_losers())
@@ -7,7 +7,6 @@ import time
 import pandas as pd
 import requests
 import json
-from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
@@ -17,10 +16,13 @@ from selenium.webdriver.chrome.options import Options
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 import os
 import platform
+from chartink_client import BROWSER_HEADERS, records_to_frame, response_json
+from csrf_cache import CsrfTokenCache, DEFAULT_CACHE_FILE
+from output_sinks import write_outputs
 
 
 class ChartinkScraper:
-    def __init__(self, headless=False, use_existing_chrome=False, csrf_token=None):
+    def __init__(self, headless=False, use_existing_chrome=False, csrf_token=None, token_cache=None):
         """
         Initialize the scraper with Chrome WebDriver
         
@@ -28,11 +30,13 @@ class ChartinkScraper:
             headless: Run browser in headless mode (default: False)
             use_existing_chrome: Try to connect to existing Chrome instance (default: False)
             csrf_token: CSRF token for API requests (default: None)
+            token_cache: CsrfTokenCache shared between runs (default: None, uses the disk cache)
         """
         self.driver = None
         self.headless = headless
         self.use_existing_chrome = use_existing_chrome
         self.csrf_token = csrf_token
+        self.token_cache = token_cache if token_cache is not None else CsrfTokenCache(cache_file=DEFAULT_CACHE_FILE)
         self.session = requests.Session()
         # Will fetch CSRF token dynamically if not provided or if it fails
         self._setup_session()
@@ -41,36 +45,29 @@ class ChartinkScraper:
     
     def _setup_session(self):
         """Setup requests session with headers"""
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Referer': 'https://chartink.com/',
-            'Origin': 'https://chartink.com',
-            'Accept': 'application/json, text/javascript, */*; q=0.01'
-        })
+        self.session.headers.update(BROWSER_HEADERS)
     
-    def _fetch_csrf_token(self, url):
+    def _fetch_csrf_token(self, url, force_refresh=False):
         """
-        Fetch CSRF token from the page (following Chartink's pattern)
+        Fetch CSRF token from the token cache, or from the page on a cache miss
+        (following Chartink's pattern)
         
         Args:
             url: Chartink screener URL
+            force_refresh: Discard the current token (e.g. after HTTP 419) (default: False)
         
         Returns:
             str: CSRF token or None
         """
         try:
-            print("Fetching CSRF token from page...")
-            # Get the screener page first
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            # Parse HTML to find CSRF token from meta tag (Chartink's method)
-            soup = BeautifulSoup(response.content, 'lxml')
-            meta = soup.find("meta", {"name": "csrf-token"})
-            
-            if meta and meta.get("content"):
-                csrf_token = meta["content"]
-                print(f"Found CSRF token in meta tag: {csrf_token[:20]}...")
+            print("Fetching CSRF token...")
+            if force_refresh:
+                csrf_token = self.token_cache.refresh(self.session, url, stale_token=self.csrf_token, timeout=10)
+            else:
+                csrf_token = self.token_cache.get_token(self.session, url, timeout=10)
+            
+            if csrf_token:
+                print(f"Found CSRF token: {csrf_token[:20]}...")
                 self.csrf_token = csrf_token
                 # Update session headers with new token (lowercase x-csrf-token as per Chartink)
                 self.session.headers.update({
@@ -375,7 +372,7 @@ class ChartinkScraper:
         Extract stock data from the table
         
         Returns:
-            list: List of dictionaries containing stock data
+            list: List of dictionaries containing stock data (empty on failure)
         """
         stocks_data = []
         
@@ -531,15 +528,19 @@ class ChartinkScraper:
             print(f"CSV export method also failed: {e}")
             return []
     
-    def save_to_excel(self, stocks_data, filename="chartink_stocks.xlsx"):
+    def save_to_excel(self, stocks_data, filename="chartink_stocks.xlsx", formats=None):
         """
-        Save stock data to Excel file
+        Save stock data to Excel file (and any other configured output formats)
         
         Args:
-            stocks_data: List of dictionaries containing stock data
-            filename: Output Excel filename
+            stocks_data: DataFrame or list of dictionaries containing stock data
+            filename: Output Excel filename (other formats use the same base name)
+            formats: Output formats (default: None, CHARTINK_OUTPUT_FORMATS or Excel)
+
+        Returns:
+            bool: True if at least one file was written
         """
-        if not stocks_data:
+        if stocks_data is None or len(stocks_data) == 0:
             print("No data to save!")
             return False
         
@@ -550,9 +551,12 @@ class ChartinkScraper:
             # Clean column names
             df.columns = df.columns.str.strip()
             
-            # Save to Excel
-            df.to_excel(filename, index=False, engine='openpyxl')
-            print(f"Data saved successfully to {filename}")
+            # Save to every configured format
+            written = write_outputs(df, filename, formats=formats)
+            if not written:
+                print(f"[WARNING] Nothing was saved for {filename} (every format was skipped or locked)")
+                return False
+            print(f"Data saved successfully to {', '.join(written)}")
             print(f"Total stocks saved: {len(df)}")
             return True
             
@@ -572,7 +576,7 @@ class ChartinkScraper:
             url: Screener URL to fetch CSRF token from (optional)
         
         Returns:
-            list: List of dictionaries containing stock data
+            pd.DataFrame or list: Typed stock data (empty list on failure)
         """
         # Fetch CSRF token if not available or if previous attempt failed
         if not self.csrf_token and url:
@@ -623,7 +627,7 @@ class ChartinkScraper:
                 
                 if response.status_code == 200:
                     try:
-                        data = response.json()
+                        data = response_json(response)
                         print(f"API Response keys: {list(data.keys()) if isinstance(data, dict) else 'List response'}")
                         
                         # Chartink typically returns data in 'data' key
@@ -637,7 +641,7 @@ class ChartinkScraper:
                         else:
                             # Try to parse directly
                             stocks_data = self._parse_api_response(data)
-                            if stocks_data:
+                            if len(stocks_data) > 0:
                                 print(f"Successfully fetched {len(stocks_data)} stocks via API")
                                 return stocks_data
                     except json.JSONDecodeError as e:
@@ -648,7 +652,7 @@ class ChartinkScraper:
                     # Try to fetch fresh CSRF token and retry once
                     if url:
                         print("Attempting to fetch fresh CSRF token...")
-                        new_token = self._fetch_csrf_token(url)
+                        new_token = self._fetch_csrf_token(url, force_refresh=True)
                         if new_token:
                             print(f"Retrying with fresh CSRF token: {new_token[:20]}...")
                             # Retry the request with new token
@@ -662,7 +666,7 @@ class ChartinkScraper:
                             print(f"Retry API returned status code: {retry_response.status_code}")
                             if retry_response.status_code == 200:
                                 try:
-                                    data = retry_response.json()
+                                    data = response_json(retry_response)
                                     print(f"Retry API Response keys: {list(data.keys()) if isinstance(data, dict) else 'List response'}")
                                     if isinstance(data, dict) and 'data' in data:
                                         stocks_data = data['data']
@@ -672,7 +676,7 @@ class ChartinkScraper:
                                             return normalized_data
                                     else:
                                         stocks_data = self._parse_api_response(data)
-                                        if stocks_data:
+                                        if len(stocks_data) > 0:
                                             print(f"Successfully fetched {len(stocks_data)} stocks via API (after token refresh)")
                                             return stocks_data
                                 except Exception as e:
@@ -709,22 +713,10 @@ class ChartinkScraper:
             stocks_data: Raw stock data from API
         
         Returns:
-            list: List of dictionaries containing normalized stock data
+            pd.DataFrame: Typed stock data (positional rows get Column_N names)
         """
-        normalized_data = []
-        
         try:
-            for item in stocks_data:
-                if isinstance(item, dict):
-                    normalized_data.append(item)
-                elif isinstance(item, (list, tuple)):
-                    # If it's a list, convert to dict with default column names
-                    row_dict = {}
-                    for idx, value in enumerate(item):
-                        row_dict[f"Column_{idx+1}"] = value
-                    normalized_data.append(row_dict)
-            
-            return normalized_data
+            return records_to_frame(stocks_data)
         except Exception as e:
             print(f"Error normalizing stock data: {e}")
             return stocks_data if isinstance(stocks_data, list) else []
@@ -737,7 +729,7 @@ class ChartinkScraper:
             data: JSON response from API
         
         Returns:
-            list: List of dictionaries containing stock data
+            pd.DataFrame: Typed stock data (empty list on failure)
         """
         stocks_data = []
         
@@ -789,7 +781,7 @@ class ChartinkScraper:
             screener_id = url.split('/')[-1] if '/' in url else "stock-screener-open-high-open-low"
             stocks_data = self.fetch_data_via_api(screener_id, url=url)
             
-            if stocks_data:
+            if len(stocks_data) > 0:
                 # Save to Excel
                 self.save_to_excel(stocks_data, output_file)
                 return stocks_data
@@ -813,7 +805,7 @@ class ChartinkScraper:
             stocks_data = self.extract_stock_data()
             
             # Save to Excel
-            if stocks_data:
+            if len(stocks_data) > 0:
                 self.save_to_excel(stocks_data, output_file)
                 return stocks_data
             else:
@@ -855,7 +847,7 @@ def main():
         # Scrape the data
         stocks_data = scraper.scrape(url, output_file, change_filter=True)
         
-        if stocks_data:
+        if len(stocks_data) > 0:
             print(f"\n✓ Successfully scraped {len(stocks_data)} stocks")
             print(f"✓ Data saved to {output_file}")
         else:
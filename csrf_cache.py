@@ -0,0 +1,149 @@
+"""
+CSRF Token Cache
+Keeps the Chartink CSRF token and session cookies between requests so the
+screener page is only downloaded again when the token expires or is rejected (HTTP 419)
+"""
+
+import json
+import os
+import threading
+import time
+from chartink_client import get_csrf_token, post_scan_clause
+
+# Default lifetime of a cached token (Chartink sessions last much longer)
+DEFAULT_TTL = 30 * 60
+
+# Disk cache used by short-lived scripts (main.py, main_gainers_losers.py, chartink_scraper.py)
+DEFAULT_CACHE_FILE = ".chartink_csrf_cache.json"
+
+
+class CsrfTokenCache:
+    def __init__(self, ttl=DEFAULT_TTL, cache_file=None):
+        """
+        Process-wide CSRF token cache
+
+        Args:
+            ttl: Token lifetime in seconds (default: 30 minutes)
+            cache_file: JSON file to persist the token and cookies to
+                        (default: None, keep in memory only - used by the Streamlit server)
+        """
+        self.ttl = ttl
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+        self._entry = self._load() if cache_file else None
+
+    def _is_fresh(self, entry):
+        """Check whether a cache entry exists and is within its TTL"""
+        return bool(entry) and entry.get("token") and time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def _load(self):
+        """Load the cache entry from disk"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Could not read CSRF token cache: {e}")
+        return None
+
+    def _save(self):
+        """Write the cache entry to disk (no-op for the in-memory cache)"""
+        if not self.cache_file:
+            return
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self._entry, f)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"[WARNING] Could not write CSRF token cache: {e}")
+
+    def _apply_cookies(self, session, entry):
+        """Copy the cached cookies onto a session so the token stays valid for it"""
+        for cookie in entry.get("cookies", []):
+            session.cookies.set(cookie["name"], cookie["value"], domain=cookie["domain"], path=cookie["path"])
+
+    def store(self, session, token):
+        """Store a token (and the session's current cookies) obtained elsewhere"""
+        with self._lock:
+            self._store(session, token)
+
+    def _store(self, session, token):
+        self._entry = {
+            "token": token,
+            "fetched_at": time.time(),
+            "cookies": [
+                {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+                for c in session.cookies
+            ],
+        }
+        self._save()
+
+    def _fetch(self, session, screener_url, timeout):
+        """Download the screener page and cache its token"""
+        token = get_csrf_token(session, screener_url, timeout=timeout)
+        if token:
+            self._store(session, token)
+        else:
+            self._entry = None
+        return token
+
+    def get_token(self, session, screener_url, timeout=30):
+        """
+        Return a valid CSRF token, downloading the screener page only on a cache miss
+
+        Args:
+            session: requests session (cached cookies are applied to it)
+            screener_url: Chartink screener URL to fetch the token from on a miss
+            timeout: Request timeout in seconds
+
+        Returns:
+            str: CSRF token or None
+        """
+        with self._lock:
+            if self._is_fresh(self._entry):
+                self._apply_cookies(session, self._entry)
+                return self._entry["token"]
+            return self._fetch(session, screener_url, timeout)
+
+    def refresh(self, session, screener_url, stale_token=None, timeout=30):
+        """
+        Replace a rejected token
+
+        If another caller already refreshed the token since `stale_token` was
+        handed out, the newer token is reused instead of fetching the page again.
+        """
+        with self._lock:
+            entry = self._entry
+            if stale_token and self._is_fresh(entry) and entry["token"] != stale_token:
+                self._apply_cookies(session, entry)
+                return entry["token"]
+            return self._fetch(session, screener_url, timeout)
+
+    def invalidate(self):
+        """Drop the cached token"""
+        with self._lock:
+            self._entry = None
+            if self.cache_file and os.path.exists(self.cache_file):
+                try:
+                    os.remove(self.cache_file)
+                except OSError:
+                    pass
+
+    def post(self, session, screener_url, scan_clause, timeout=30):
+        """
+        POST a scan clause with the cached token, refreshing it once on HTTP 419
+
+        Returns:
+            requests.Response: Raw API response (None if no token could be obtained)
+        """
+        token = self.get_token(session, screener_url, timeout=timeout)
+        if not token:
+            return None
+        response = post_scan_clause(session, token, scan_clause, timeout=timeout)
+        if response.status_code == 419:
+            print("[INFO] CSRF token rejected (419), fetching a fresh one...")
+            token = self.refresh(session, screener_url, stale_token=token, timeout=timeout)
+            if token:
+                response = post_scan_clause(session, token, scan_clause, timeout=timeout)
+        return response
@@ -0,0 +1,141 @@
+"""
+Excel Writer
+Writes the styled gainers/losers workbook in a single forward pass using
+openpyxl's write-only mode and named styles shared by every cell
+"""
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+from output_format import quoted_values
+
+# Widest a column is allowed to get
+MAX_COLUMN_WIDTH = 50
+
+
+def _named_styles():
+    """Create the workbook's styles once; cells only reference them by name"""
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    return [
+        NamedStyle(
+            name='banner',
+            font=Font(bold=True, size=10, color="666666"),
+            alignment=Alignment(horizontal='left', vertical='center'),
+        ),
+        NamedStyle(
+            name='header',
+            font=Font(bold=True, color="FFFFFF", size=11),
+            fill=PatternFill(start_color="366092", end_color="366092", fill_type="solid"),
+            alignment=Alignment(horizontal='center', vertical='center'),
+            border=border,
+        ),
+        NamedStyle(
+            name='data',
+            alignment=Alignment(horizontal='left', vertical='center'),
+            border=border,
+        ),
+        NamedStyle(
+            name='section',
+            font=Font(bold=True, size=10),
+            fill=PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid"),
+            alignment=Alignment(horizontal='left', vertical='center'),
+            border=border,
+        ),
+    ]
+
+
+def _row_values(df):
+    """Rows as tuples of plain Python values (missing values become empty cells)"""
+    columns = {}
+    for name in df.columns:
+        column = quoted_values(df[name]).astype(object)
+        columns[name] = column.where(column.notna(), None)
+    return list(zip(*columns.values()))
+
+
+def column_widths(df, max_width=MAX_COLUMN_WIDTH):
+    """
+    Column widths from the DataFrame: longest header or value per column, plus padding
+
+    Lengths are taken per column with vectorized string operations, so the
+    cost does not depend on a writer walking every cell.
+
+    Args:
+        df: Data to be written
+        max_width: Cap for any one column (default: MAX_COLUMN_WIDTH)
+
+    Returns:
+        list: One width per column
+    """
+    widths = []
+    for name in df.columns:
+        longest = quoted_values(df[name]).astype('string').str.len().max()
+        longest = 0 if pd.isna(longest) else int(longest)
+        widths.append(min(max(len(str(name)), longest) + 2, max_width))
+    return widths
+
+
+def write_styled_workbook(df, output_file, sheet_name='Gainers & Losers', banner=None,
+                          section_column='Section', widths=None, changes=None):
+    """
+    Write a DataFrame as a formatted sheet in one pass
+
+    Layout matches the original post-formatted workbook: a merged banner row,
+    a blue header row, bordered data rows, and the first row of every section
+    highlighted.
+
+    Args:
+        df: Data to write (columns in display order)
+        output_file: Path of the .xlsx file
+        sheet_name: Worksheet title (default: 'Gainers & Losers')
+        banner: Text for the merged first row, e.g. the update time (default: None, no banner)
+        section_column: Column whose value changes start a new section (default: 'Section')
+        widths: One width per column (default: None, use column_widths(df))
+        changes: Rows for a 'Changes since last run' block below the data,
+                 e.g. from snapshot_diff.SnapshotDiff.to_frame (default: None, no block)
+    """
+    columns = [str(col) for col in df.columns]
+    rows = _row_values(df)
+
+    widths = column_widths(df) if widths is None else widths
+
+    wb = Workbook(write_only=True)
+    for style in _named_styles():
+        wb.add_named_style(style)
+    ws = wb.create_sheet(sheet_name)
+
+    # Column widths must be set before the first row is streamed
+    for idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+
+    if banner:
+        ws.append([styled(banner, 'banner')])
+        ws.merged_cells.add(f"A1:{get_column_letter(max(len(columns), 1))}1")
+
+    ws.append([styled(col, 'header') for col in columns])
+
+    section_idx = columns.index(section_column) if section_column in columns else None
+    current_section = None
+    for row in rows:
+        style = 'data'
+        if section_idx is not None and row[section_idx] != current_section:
+            current_section = row[section_idx]
+            style = 'section'
+        ws.append([styled(value, style) for value in row])
+
+    if changes is not None and not changes.empty:
+        ws.append([])
+        ws.append([styled('Changes since last run', 'section')])
+        ws.append([styled(str(col), 'header') for col in changes.columns])
+        for row in _row_values(changes):
+            ws.append([styled(value, 'data') for value in row])
+
+    wb.save(output_file)
@@ -0,0 +1,137 @@
+"""
+History Store
+Append-only, per-day history of intraday snapshots. Every run adds its rows
+to the day's CSV file (tagged with the run timestamp) and one line to a small
+index file, so earlier rows are never rewritten and a single run can be read
+back without parsing the whole day.
+"""
+
+import csv
+import io
+import os
+from datetime import datetime
+import pandas as pd
+from output_format import quoted_values
+
+# Folder holding one history file (plus its index) per trading day
+DEFAULT_HISTORY_DIR = "history"
+
+# Column added to every row with the time of the run that wrote it
+RUN_COLUMN = "run_at"
+
+# Format of RUN_COLUMN values
+RUN_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_INDEX_FIELDS = [RUN_COLUMN, "offset", "length", "rows"]
+
+
+class DailyHistory:
+    def __init__(self, directory=DEFAULT_HISTORY_DIR, prefix="gainers_losers"):
+        """
+        Per-day append-only snapshot history
+
+        Args:
+            directory: Folder for the history files (default: DEFAULT_HISTORY_DIR)
+            prefix: File name prefix, e.g. gainers_losers_2024-01-31.csv (default: 'gainers_losers')
+        """
+        self.directory = directory
+        self.prefix = prefix
+
+    def data_file(self, day):
+        """Path of the history CSV for a date"""
+        return os.path.join(self.directory, f"{self.prefix}_{day.strftime('%Y-%m-%d')}.csv")
+
+    def index_file(self, day):
+        """Path of the run index for a date (one line per run: timestamp, byte offset, length, rows)"""
+        return os.path.join(self.directory, f"{self.prefix}_{day.strftime('%Y-%m-%d')}.index.csv")
+
+    def _header(self, data_file):
+        """Columns of an existing history file (first line only), or None for a new file"""
+        if not os.path.exists(data_file) or os.path.getsize(data_file) == 0:
+            return None
+        with open(data_file, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader([f.readline()]))
+
+    def append(self, df, run_at=None):
+        """
+        Append one snapshot to its day's history
+
+        Only the new rows are written, so the cost does not grow with the number
+        of runs already recorded. Later runs use the columns of the day's first
+        run (missing ones are left empty, new ones are dropped).
+
+        Args:
+            df: Snapshot rows
+            run_at: Time of the run (default: None, now)
+
+        Returns:
+            str: Path of the history file written to
+        """
+        run_at = run_at or datetime.now()
+        data_file = self.data_file(run_at)
+        os.makedirs(self.directory, exist_ok=True)
+
+        header = self._header(data_file)
+        rows = df.apply(quoted_values)
+        rows.insert(0, RUN_COLUMN, run_at.strftime(RUN_FORMAT))
+        if header is not None:
+            rows = rows.reindex(columns=header)
+        block = rows.to_csv(index=False, header=header is None, lineterminator="\n").encode("utf-8")
+
+        with open(data_file, "ab") as f:
+            offset = f.tell()
+            f.write(block)
+
+        index_file = self.index_file(run_at)
+        new_index = not os.path.exists(index_file)
+        with open(index_file, "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            if new_index:
+                writer.writerow(_INDEX_FIELDS)
+            writer.writerow([run_at.strftime(RUN_FORMAT), offset, len(block), len(rows)])
+        return data_file
+
+    def runs(self, day=None):
+        """
+        Runs recorded for a day
+
+        Returns:
+            pd.DataFrame: One row per run, indexed by run timestamp (empty if none)
+        """
+        index_file = self.index_file(day or datetime.now())
+        if not os.path.exists(index_file):
+            return pd.DataFrame(columns=_INDEX_FIELDS[1:])
+        return pd.read_csv(index_file, index_col=RUN_COLUMN, parse_dates=[RUN_COLUMN])
+
+    def read(self, day=None, run_at=None):
+        """
+        Read a day's history, or only one run of it
+
+        Args:
+            day: Date to read (default: None, today)
+            run_at: Read only the run with this timestamp (default: None, every run)
+
+        Returns:
+            pd.DataFrame: Rows indexed by run timestamp (empty if nothing was recorded)
+        """
+        day = day or run_at or datetime.now()
+        data_file = self.data_file(day)
+        header = self._header(data_file)
+        if header is None:
+            return pd.DataFrame()
+
+        if run_at is None:
+            return pd.read_csv(data_file, index_col=RUN_COLUMN, parse_dates=[RUN_COLUMN])
+
+        runs = self.runs(day)
+        matches = runs[runs.index == pd.Timestamp(run_at.strftime(RUN_FORMAT))]
+        if matches.empty:
+            return pd.DataFrame(columns=header).set_index(RUN_COLUMN)
+        entry = matches.iloc[-1]
+        with open(data_file, "rb") as f:
+            f.seek(int(entry["offset"]))
+            block = f.read(int(entry["length"]))
+        if int(entry["offset"]) == 0:
+            # The first run's block starts with the header line
+            return pd.read_csv(io.BytesIO(block), index_col=RUN_COLUMN, parse_dates=[RUN_COLUMN])
+        return pd.read_csv(io.BytesIO(block), names=header, index_col=RUN_COLUMN, parse_dates=[RUN_COLUMN])
@@ -2,6 +2,11 @@ import pandas as pd
 import requests
 from bs4 import BeautifulSoup as bs
 import os
+from chartink_client import records_to_frame, response_json
+from csrf_cache import CsrfTokenCache, DEFAULT_CACHE_FILE
+from scan_clause import race_scan_clauses, page_fingerprint, ScanClauseCache
+from stock_ranking import resolve_schema
+from output_sinks import write_outputs
 
 # Screener page URL to get CSRF token
 # Using the specific screener URL that matches your Chartink view
@@ -14,22 +19,44 @@ api_url = "https://chartink.com/screener/process"
 # Based on the filter shown: "Stock passes all of the below filters in nifty 100 segment:"
 # Condition: "Daily Open Equals Daily High"
 # This translates to: nifty 100 segment with latest open = latest high
-condition = {"scan_clause": "( {nifty100} ( latest open = latest high ) )"}
+default_scan_clause = "( {nifty100} ( latest open = latest high ) )"
 
-print("Fetching data from Chartink...")
-print(f"Condition: {condition['scan_clause']}\n")
 
-with requests.session() as s:
-    # Step 1: Get the screener page to extract CSRF token and condition
-    # NOTE: CSRF token is NOT from a browser - it's from the HTTP response!
-    # When we GET the webpage, Chartink includes the token in the HTML meta tag
-    # This is a security token that prevents CSRF attacks
-    print("Step 1: Getting CSRF token from webpage...")
-    print("   (This token is embedded in the HTML, not from a browser)")
-    r_data = s.get(screener_url)
-    soup = bs(r_data.content, "lxml")
-    meta = soup.find("meta", {"name": "csrf-token"})["content"]
-    print(f"   CSRF token: {meta[:20]}...\n")
+def save_results(stock_list, output_file, indent=""):
+    """
+    Write results to every configured format and report what was saved
+
+    Args:
+        stock_list: DataFrame to save
+        output_file: Output path (its extension is replaced per format)
+        indent: Prefix for the printed status line (default: "")
+
+    Returns:
+        bool: True if at least one file was written
+    """
+    # Files are swapped in atomically; if one is open in Excel the swap is retried
+    written = write_outputs(stock_list, output_file)
+    if written:
+        print(f"{indent}[OK] Data saved to {', '.join(written)}")
+    else:
+        print(f"{indent}[WARNING] Nothing was saved for {output_file} (every format was skipped or locked)")
+    return bool(written)
+
+
+def discover_scan_clause(s, soup, meta):
+    """
+    Work out the scan clause for the screener page (Step 1.5)
+
+    Args:
+        s: requests session holding the Chartink cookies
+        soup: BeautifulSoup of the screener page
+        meta: CSRF token for the test POSTs
+
+    Returns:
+        tuple: (condition dict, name of the strategy that produced it)
+    """
+    condition = {"scan_clause": default_scan_clause}
+    strategy = "default"
     
     # Try to extract the actual scan clause from the page
     # Chartink stores it in various places - let's check multiple locations
@@ -79,6 +106,7 @@ with requests.session() as s:
                             scan_clause_from_page = found_clause
                             print(f"   [OK] Found scan clause in JSON data: {scan_clause_from_page[:100]}...")
                             condition = {"scan_clause": scan_clause_from_page}
+                            strategy = "json_state"
                             break
                     except:
                         pass
@@ -118,6 +146,7 @@ with requests.session() as s:
                         scan_clause_from_page = potential_clause
                         print(f"   [OK] Found scan clause in page: {scan_clause_from_page[:100]}...")
                         condition = {"scan_clause": scan_clause_from_page}
+                        strategy = "script_pattern"
                         break
             if scan_clause_from_page:
                 break
@@ -132,6 +161,7 @@ with requests.session() as s:
                 r'\{[^}]*(?:futures?|nifty|cash)[^}]*\}',
                 r'\([^)]*(?:open|high)[^)]*\)',
             ]
+            candidate_clauses = []
             for pattern in segment_patterns:
                 matches = re.finditer(pattern, page_text, re.IGNORECASE)
                 for match in matches:
@@ -142,17 +172,18 @@ with requests.session() as s:
                         if '{' in potential and '}' in potential:
                             # It's a segment, try to use it
                             test_clause = f"( {potential} ( latest open = latest high ) )"
-                            print(f"   Testing constructed clause: {test_clause[:80]}...")
-                            test_response = s.post(api_url, headers={"x-csrf-token": meta}, data={"scan_clause": test_clause}, timeout=5)
-                            if test_response.status_code == 200:
-                                test_data = test_response.json()
-                                if test_data.get("data") and len(test_data.get("data", [])) > 0:
-                                    scan_clause_from_page = test_clause
-                                    condition = {"scan_clause": test_clause}
-                                    print(f"   [OK] Working condition found!")
-                                    break
-                if scan_clause_from_page:
-                    break
+                            if test_clause not in candidate_clauses:
+                                candidate_clauses.append(test_clause)
+            
+            # Test all constructed clauses in parallel - the earliest one with data wins
+            if candidate_clauses:
+                print(f"   Testing {len(candidate_clauses)} constructed clauses in parallel...")
+                working_clause, _ = race_scan_clauses(s, meta, candidate_clauses, timeout=5)
+                if working_clause:
+                    scan_clause_from_page = working_clause
+                    condition = {"scan_clause": working_clause}
+                    strategy = "page_text_probe"
+                    print(f"   [OK] Working condition found!")
     
     # Method 2: Check for data attributes and hidden inputs
     if not scan_clause_from_page:
@@ -162,6 +193,7 @@ with requests.session() as s:
             scan_clause_from_page = data_elements[0].get('data-scan-clause')
             print(f"   [OK] Found scan clause in data attribute: {scan_clause_from_page[:100]}...")
             condition = {"scan_clause": scan_clause_from_page}
+            strategy = "data_attribute"
         
         # Check hidden input fields
         if not scan_clause_from_page:
@@ -172,6 +204,7 @@ with requests.session() as s:
                     if scan_clause_from_page and 'open' in scan_clause_from_page.lower() and 'high' in scan_clause_from_page.lower():
                         print(f"   [OK] Found scan clause in hidden input: {scan_clause_from_page[:100]}...")
                         condition = {"scan_clause": scan_clause_from_page}
+                        strategy = "hidden_input"
                         break
         
         # Check for JSON-LD or data-* attributes on main container
@@ -185,6 +218,7 @@ with requests.session() as s:
                             scan_clause_from_page = attr_value
                             print(f"   [OK] Found scan clause in {attr_name}: {scan_clause_from_page[:100]}...")
                             condition = {"scan_clause": scan_clause_from_page}
+                            strategy = "container_attribute"
                             break
                 if scan_clause_from_page:
                     break
@@ -215,36 +249,53 @@ with requests.session() as s:
             # Try with "in" keyword instead of segment wrapper
             "( latest open = latest high and {nifty100} )",
             "( latest open = latest high and {nifty 100} )",
-            # Fallback: all stocks (will filter to Nifty 100 manually)
-            "( latest open = latest high )",
         ]
         
-        # Test which condition works
-        working_condition = None
-        for test_cond in segment_tests:
-            print(f"   Testing: {test_cond[:60]}...")
-            test_response = s.post(api_url, headers={"x-csrf-token": meta}, data={"scan_clause": test_cond}, timeout=10)
-            if test_response.status_code == 200:
-                test_data = test_response.json()
-                # Check if there's a scan error
-                if "scan_error" in test_data:
-                    print(f"      [ERROR] Scan error: {test_data.get('scan_error', 'Unknown error')}")
-                    continue
-                if test_data.get("data") and len(test_data["data"]) > 0:
-                    print(f"      [OK] Found {len(test_data['data'])} stocks with this condition!")
-                    working_condition = test_cond
-                    condition = {"scan_clause": test_cond}
-                    break
-                else:
-                    print(f"      No data (0 records)")
-            else:
-                print(f"      HTTP {test_response.status_code}")
+        # Test all Nifty 100 candidates in parallel - the earliest one in the list that returns data wins
+        # (the all-stocks clause is only used below, once every candidate has failed)
+        working_condition, _ = race_scan_clauses(s, meta, segment_tests, timeout=10)
         
         if working_condition:
+            condition = {"scan_clause": working_condition}
+            strategy = "segment_probe"
             print(f"\n   [OK] Using working condition: {working_condition}")
         else:
             print("\n   [WARNING] No working segment found. Using all stocks condition.")
             condition = {"scan_clause": "( latest open = latest high )"}
+            strategy = "fallback"
+    
+    return condition, strategy
+
+
+print("Fetching data from Chartink...")
+print(f"Condition: {default_scan_clause}\n")
+
+with requests.session() as s:
+    # Step 1: Get the screener page to extract CSRF token and condition
+    # NOTE: CSRF token is NOT from a browser - it's from the HTTP response!
+    # When we GET the webpage, Chartink includes the token in the HTML meta tag
+    # This is a security token that prevents CSRF attacks
+    print("Step 1: Getting CSRF token from webpage...")
+    print("   (This token is embedded in the HTML, not from a browser)")
+    r_data = s.get(screener_url)
+    soup = bs(r_data.content, "lxml")
+    meta = soup.find("meta", {"name": "csrf-token"})["content"]
+    print(f"   CSRF token: {meta[:20]}...\n")
+    # The page body is needed below for clause discovery, so instead of reading
+    # the shared token cache we seed it for the other scripts
+    CsrfTokenCache(cache_file=DEFAULT_CACHE_FILE).store(s, meta)
+    
+    # Reuse the clause discovered on an earlier run unless the screener page changed
+    fingerprint = page_fingerprint(soup, meta)
+    clause_cache = ScanClauseCache()
+    cached_entry = clause_cache.get(screener_url, fingerprint)
+    if cached_entry:
+        condition = {"scan_clause": cached_entry["scan_clause"]}
+        strategy = cached_entry["strategy"]
+        print(f"Step 1.5: Using cached scan clause (found by '{strategy}' on {cached_entry['discovered_at']})")
+        print(f"   {condition['scan_clause'][:100]}\n")
+    else:
+        condition, strategy = discover_scan_clause(s, soup, meta)
 
     # Step 2: Make API request with CSRF token
     print("Step 2: Fetching stock data...")
@@ -252,11 +303,26 @@ with requests.session() as s:
     response = s.post(api_url, headers=header, data=condition)
     
     if response.status_code == 200:
-        data = response.json()
+        data = response_json(response)
+        
+        if "scan_error" in data and cached_entry:
+            # The cached clause stopped working - forget it and discover again
+            print(f"   [WARNING] Cached scan clause returned a scan error: {data.get('scan_error')}")
+            print("   Re-running scan clause discovery...")
+            clause_cache.invalidate(screener_url)
+            cached_entry = None
+            condition, strategy = discover_scan_clause(s, soup, meta)
+            response = s.post(api_url, headers=header, data=condition)
+            data = response_json(response) if response.status_code == 200 else {}
+        
+        # Remember clauses that were actually found (never the all-stocks fallback)
+        if not cached_entry and strategy not in ("default", "fallback") and data.get("data"):
+            clause_cache.store(screener_url, fingerprint, condition["scan_clause"], strategy)
+            print(f"   [OK] Cached scan clause (strategy: {strategy})")
         
         # Step 3: Extract stock data
         if "data" in data and len(data["data"]) > 0:
-            stock_list = pd.DataFrame(data["data"])
+            stock_list = records_to_frame(data["data"])
             print(f"\n[OK] Successfully fetched {len(stock_list)} stocks")
             
             # Debug: Show column names to identify the correct column
@@ -264,12 +330,8 @@ with requests.session() as s:
             
             # Step 4: Sort and filter for best results
             # Find the percentage change column (try multiple possible names)
-            pct_col = None
-            for col in stock_list.columns:
-                col_lower = str(col).lower()
-                if 'chg' in col_lower or 'change' in col_lower or 'pct' in col_lower or '%' in col_lower:
-                    pct_col = col
-                    break
+            # (column roles are resolved once per response layout and validated)
+            pct_col = resolve_schema(stock_list).pct_change
             
             if pct_col:
                 print(f"[INFO] Sorting by column: '{pct_col}'")
@@ -376,19 +438,8 @@ with requests.session() as s:
             top_10 = stock_list.head(10)[display_cols]
             print(top_10.to_string(index=False))
             
-            # Step 5: Save to Excel (with timestamp to avoid permission errors)
-            import datetime
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file_with_timestamp = f"chartink_nifty100_stocks_{timestamp}.xlsx"
-            
-            try:
-                stock_list.to_excel(output_file, index=False)
-                print(f"\n[OK] Data saved to {output_file}")
-            except PermissionError:
-                # If file is open, save with timestamp
-                stock_list.to_excel(output_file_with_timestamp, index=False)
-                print(f"\n[WARNING] {output_file} is open in Excel")
-                print(f"[OK] Data saved to {output_file_with_timestamp} instead")
+            # Step 5: Save results (formats from CHARTINK_OUTPUT_FORMATS)
+            save_results(stock_list, output_file, indent="\n")
             
             print(f"   Total stocks: {len(stock_list)}")
             
@@ -425,23 +476,15 @@ with requests.session() as s:
                 "( daily open = daily high )",
             ]
             
-            for all_cond in all_stocks_conditions:
-                print(f"   Trying: {all_cond}")
-                all_response = s.post(api_url, headers=header, data={"scan_clause": all_cond})
-                if all_response.status_code == 200:
-                    all_data = all_response.json()
-                    if all_data.get("data") and len(all_data["data"]) > 0:
-                        print(f"   [OK] Found {len(all_data['data'])} stocks with Open = High (all segments)!")
-                        stock_list = pd.DataFrame(all_data["data"])
-                        output_file = "chartink_open_high_stocks.xlsx"
-                        stock_list.to_excel(output_file, index=False)
-                        print(f"   [OK] Data saved to {output_file}")
-                        print(f"\n   Note: This includes all stocks, not just Nifty 200")
-                        print(f"   First few stocks:")
-                        print(stock_list.head())
-                        break
-                    else:
-                        print(f"   Still 0 records")
+            all_cond, all_data = race_scan_clauses(s, meta, all_stocks_conditions)
+            if all_data:
+                print(f"   [OK] Found {len(all_data['data'])} stocks with Open = High (all segments)!")
+                stock_list = records_to_frame(all_data["data"])
+                output_file = "chartink_open_high_stocks.xlsx"
+                save_results(stock_list, output_file, indent="   ")
+                print(f"\n   Note: This includes all stocks, not just Nifty 200")
+                print(f"   First few stocks:")
+                print(stock_list.head())
             
             # Strategy 2: Try different segment name formats
             print("\n2. Testing: Different Nifty 200 segment name formats...")
@@ -454,19 +497,12 @@ with requests.session() as s:
             segment_works = False
             working_segment = None
             
-            for seg_name in segment_variations:
-                test_cond = f"( {{{seg_name}}} )"
-                print(f"   Trying: {test_cond}")
-                test_response = s.post(api_url, headers=header, data={"scan_clause": test_cond})
-                if test_response.status_code == 200:
-                    test_data = test_response.json()
-                    if test_data.get("data") and len(test_data["data"]) > 0:
-                        print(f"   [OK] Found {len(test_data['data'])} stocks! Segment '{seg_name}' works!")
-                        segment_works = True
-                        working_segment = seg_name
-                        break
-                    else:
-                        print(f"   Still 0 records")
+            segment_clauses = {f"( {{{seg_name}}} )": seg_name for seg_name in segment_variations}
+            seg_cond, seg_data = race_scan_clauses(s, meta, list(segment_clauses))
+            if seg_data:
+                working_segment = segment_clauses[seg_cond]
+                segment_works = True
+                print(f"   [OK] Found {len(seg_data['data'])} stocks! Segment '{working_segment}' works!")
             
             # Strategy 3: If we found a working segment, try with condition
             if segment_works and working_segment:
@@ -476,22 +512,16 @@ with requests.session() as s:
                     f"( {{{working_segment}}} ( open = high ) )",
                 ]
                 
-                for oh_cond in open_high_conditions:
-                    print(f"   Trying: {oh_cond}")
-                    oh_response = s.post(api_url, headers=header, data={"scan_clause": oh_cond})
-                    if oh_response.status_code == 200:
-                        oh_data = oh_response.json()
-                        if oh_data.get("data") and len(oh_data["data"]) > 0:
-                            print(f"   [OK] Found {len(oh_data['data'])} Nifty 200 stocks with Open = High!")
-                            stock_list = pd.DataFrame(oh_data["data"])
-                            output_file = "chartink_nifty200_stocks.xlsx"
-                            stock_list.to_excel(output_file, index=False)
-                            print(f"\n[OK] Data saved to {output_file}")
-                            print(f"\nFirst few stocks:")
-                            print(stock_list.head())
-                            break
-                        else:
-                            print(f"   Still 0 records (might be no stocks matching today)")
+                oh_cond, oh_data = race_scan_clauses(s, meta, open_high_conditions)
+                if oh_data:
+                    print(f"   [OK] Found {len(oh_data['data'])} Nifty 200 stocks with Open = High!")
+                    stock_list = records_to_frame(oh_data["data"])
+                    output_file = "chartink_nifty200_stocks.xlsx"
+                    save_results(stock_list, output_file, indent="\n")
+                    print(f"\nFirst few stocks:")
+                    print(stock_list.head())
+                else:
+                    print(f"   Still 0 records (might be no stocks matching today)")
             
             # Strategy 4: Try using market cap filter instead of segment
             if not segment_works:
@@ -503,23 +533,15 @@ with requests.session() as s:
                     "( latest open = latest high and market cap > 2000 )",
                 ]
                 
-                for mc_cond in market_cap_conditions:
-                    print(f"   Trying: {mc_cond}")
-                    mc_response = s.post(api_url, headers=header, data={"scan_clause": mc_cond})
-                    if mc_response.status_code == 200:
-                        mc_data = mc_response.json()
-                        if mc_data.get("data") and len(mc_data["data"]) > 0:
-                            print(f"   [OK] Found {len(mc_data['data'])} stocks!")
-                            stock_list = pd.DataFrame(mc_data["data"])
-                            output_file = "chartink_open_high_largecap.xlsx"
-                            stock_list.to_excel(output_file, index=False)
-                            print(f"   [OK] Data saved to {output_file}")
-                            print(f"\n   Note: This filters by market cap, not exact Nifty 200 list")
-                            print(f"   First few stocks:")
-                            print(stock_list.head())
-                            break
-                    else:
-                        print(f"   Still 0 records")
+                mc_cond, mc_data = race_scan_clauses(s, meta, market_cap_conditions)
+                if mc_data:
+                    print(f"   [OK] Found {len(mc_data['data'])} stocks!")
+                    stock_list = records_to_frame(mc_data["data"])
+                    output_file = "chartink_open_high_largecap.xlsx"
+                    save_results(stock_list, output_file, indent="   ")
+                    print(f"\n   Note: This filters by market cap, not exact Nifty 200 list")
+                    print(f"   First few stocks:")
+                    print(stock_list.head())
             
             if not segment_works:
                 print("\n[WARNING] Could not find working segment name for Nifty 200")
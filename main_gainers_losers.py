@@ -1,13 +1,21 @@
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup as bs
 import os
 import glob
+from chartink_client import fetch_gainers_losers
+from csrf_cache import CsrfTokenCache, DEFAULT_CACHE_FILE
+from symbol_index import load_symbol_index, load_index_membership
+from stock_ranking import split_by_index
+from excel_writer import column_widths
+from output_sinks import SINKS, BackgroundWriter
+from history_store import DailyHistory
+from snapshot_store import SnapshotStore
+from snapshot_diff import SnapshotDiff, SnapshotDiffer
 
-# Delete old result Excel files (keep only the CSV)
+# Delete old result files in every output format (keep only the CSV)
 print("Cleaning up old result files...")
-excel_files = glob.glob("chartink_*.xlsx")
-for file in excel_files:
+result_files = [file for sink in SINKS.values() for file in glob.glob(f"chartink_*{sink.extension}")]
+for file in result_files:
     try:
         os.remove(file)
         print(f"   Deleted: {file}")
@@ -15,68 +23,77 @@ for file in excel_files:
         pass
 print("   [OK] Cleanup complete\n")
 
-# API endpoint for processing the screener
-api_url = "https://chartink.com/screener/process"
+# Indices watched together - one fetched universe is split into all of them
+# (indices whose CSV is not in the folder are skipped)
+PRIMARY_INDEX = "Nifty 100"
+INDEX_CSV_FILES = {
+    "Nifty 100": "ind_nifty100list.csv",
+    "Nifty 50": "ind_nifty50list.csv",
+    "Nifty 200": "ind_nifty200list.csv",
+    "Nifty Bank": "ind_niftybanklist.csv",
+    "Nifty Midcap 100": "ind_niftymidcap100list.csv",
+}
 
-# URLs for gainers (Open = High) and losers (Open = Low)
-gainers_url = "https://chartink.com/screener/copy-open-high-5911"
-losers_url = "https://chartink.com/screener/copy-open-low-103152"
+# Keep only the best N stocks per list (None = all; set e.g. 10 for whole-market scans)
+TOP_N = None
 
-def fetch_stocks(session, screener_url, condition_type="high"):
-    """Fetch stocks from Chartink API"""
+# Send a single open=high OR open=low scan and split it locally (halves the API calls).
+# Off by default: /screener/process rows currently carry no open/high/low to split on,
+# so the combined POST would be wasted before falling back to the two separate scans
+USE_COMBINED_SCREEN = False
+
+# Also append every run to the day's history file (history/gainers_losers_<date>.csv)
+APPEND_DAILY_HISTORY = True
+
+# Keep every fetched snapshot (whole market, before index filtering) in snapshots/date=<date>/ (needs pyarrow)
+SAVE_PARQUET_SNAPSHOTS = True
+
+# Report stocks that entered, left or changed rank since the previous run (console + Excel "Changes" block)
+REPORT_CHANGES = True
+
+def fetch_stocks(session):
+    """
+    Fetch gainers (Open = High) and losers (Open = Low) from Chartink API concurrently
+
+    Returns:
+        tuple: (gainers_df, losers_df, failed) - a failed list comes back empty and
+               its name ('gainers' / 'losers') is in the failed set
+    """
     print(f"\n{'='*60}")
-    print(f"Fetching {condition_type.upper()} data from Chartink...")
+    print(f"Fetching GAINERS and LOSERS data from Chartink...")
     print(f"{'='*60}")
     
-    # Get CSRF token
-    print(f"\nStep 1: Getting CSRF token from {condition_type} screener...")
-    r_data = session.get(screener_url)
-    soup = bs(r_data.content, "lxml")
-    meta = soup.find("meta", {"name": "csrf-token"})["content"]
-    print(f"   CSRF token: {meta[:20]}...")
-    
-    # Determine scan clause based on condition type
-    if condition_type == "high":
-        condition = {"scan_clause": "( latest open = latest high )"}
-    else:  # low
-        condition = {"scan_clause": "( latest open = latest low )"}
-    
-    print(f"\nStep 2: Fetching stock data...")
-    print(f"   Condition: {condition['scan_clause']}")
-    
-    header = {"x-csrf-token": meta}
-    response = session.post(api_url, headers=header, data=condition)
+    if USE_COMBINED_SCREEN:
+        print(f"\nStep 1: Getting CSRF token and fetching the combined screener...")
+    else:
+        print(f"\nStep 1: Getting CSRF token and fetching both screeners concurrently...")
+    # Token and cookies are reused from disk until they expire or Chartink returns 419
+    token_cache = CsrfTokenCache(cache_file=DEFAULT_CACHE_FILE)
+    gainers_df, losers_df = fetch_gainers_losers(session, token_cache=token_cache, combined=USE_COMBINED_SCREEN)
     
-    if response.status_code == 200:
-        data = response.json()
-        if "data" in data and len(data["data"]) > 0:
-            stock_list = pd.DataFrame(data["data"])
-            print(f"   [OK] Successfully fetched {len(stock_list)} stocks")
-            return stock_list
+    for label, stock_list in (("HIGH", gainers_df), ("LOW", losers_df)):
+        if stock_list is None:
+            print(f"   [ERROR] {label}: Fetch failed")
+        elif not stock_list.empty:
+            print(f"   [OK] {label}: Successfully fetched {len(stock_list)} stocks")
         else:
-            print(f"   [WARNING] No data found")
-            return pd.DataFrame()
-    else:
-        print(f"   [ERROR] API returned status code {response.status_code}")
-        return pd.DataFrame()
+            print(f"   [WARNING] {label}: No data found")
+    
+    # Failed lists are carried on as empty ones, but reported so they are not mistaken for empty screens
+    failed = {name for name, stock_list in (("gainers", gainers_df), ("losers", losers_df)) if stock_list is None}
+    return (
+        gainers_df if gainers_df is not None else pd.DataFrame(),
+        losers_df if losers_df is not None else pd.DataFrame(),
+        failed,
+    )
 
 def load_nifty100_list():
     """Load Nifty 100 stock symbols from CSV"""
     csv_file = "ind_nifty100list.csv"
     try:
         if os.path.exists(csv_file):
-            nifty100_df = pd.read_csv(csv_file)
-            # Extract symbols and normalize
-            nifty100_symbols = nifty100_df['Symbol'].str.strip().str.upper().str.replace('-', '').tolist()
-            nifty100_symbols_original = nifty100_df['Symbol'].str.strip().str.upper().tolist()
-            nifty100_symbols = list(set(nifty100_symbols + nifty100_symbols_original))
-            nifty100_symbols = [s for s in nifty100_symbols if s and s != 'NAN' and not pd.isna(s)]
-            
-            # Add ICICIPRULI if missing
-            if 'ICICIPRULI' not in nifty100_symbols:
-                nifty100_symbols.append('ICICIPRULI')
-            
-            return nifty100_symbols
+            # Symbols are normalized (with hyphen-free aliases and ICICIPRULI) by the symbol index
+            return load_symbol_index(csv_file).symbols
         else:
             print(f"[WARNING] CSV file '{csv_file}' not found")
             return []
@@ -84,37 +101,6 @@ def load_nifty100_list():
         print(f"[ERROR] Failed to load CSV: {e}")
         return []
 
-def filter_and_sort_stocks(stock_list, nifty100_symbols, condition_type="gainers"):
-    """Filter to Nifty 100 and sort by percentage change"""
-    if stock_list.empty:
-        return stock_list
-    
-    # Find percentage change column
-    pct_col = None
-    for col in stock_list.columns:
-        col_lower = str(col).lower()
-        if 'chg' in col_lower or 'change' in col_lower or 'pct' in col_lower or '%' in col_lower:
-            pct_col = col
-            break
-    
-    # Filter to Nifty 100
-    if 'nsecode' in stock_list.columns:
-        nifty100_stocks = stock_list[stock_list['nsecode'].isin(nifty100_symbols)]
-        print(f"\n[INFO] Filtered to {len(nifty100_stocks)} Nifty 100 stocks")
-        stock_list = nifty100_stocks
-    
-    # Sort by percentage change
-    if pct_col:
-        stock_list = stock_list.copy()  # Avoid SettingWithCopyWarning
-        stock_list[pct_col] = pd.to_numeric(stock_list[pct_col], errors='coerce')
-        # For gainers: sort descending (best first)
-        # For losers: sort descending (highest % first, like Chartink - ASIANPAINT 4.67% then AXISBANK 0.15%)
-        ascending = False  # Both sorted descending by % change
-        stock_list = stock_list.sort_values(pct_col, ascending=ascending, na_position='last')
-        print(f"   [OK] Sorted by % Change ({'Best to Worst' if condition_type == 'gainers' else 'Highest to Lowest'})")
-    
-    return stock_list
-
 # Main execution
 print("\n" + "="*60)
 print("NIFTY 100 - TOP GAINERS & TOP LOSERS")
@@ -137,15 +123,51 @@ if os.path.exists(csv_file):
 
 print(f"\n[INFO] Loaded {len(nifty100_symbols)} Nifty 100 stocks from CSV{csv_date_info}")
 
+# Output files are written off the main thread
+output_writer = BackgroundWriter()
+
+# Membership bitmap for every watched index
+index_membership = load_index_membership(INDEX_CSV_FILES)
+print(f"[INFO] Watching indices: {', '.join(index_membership.names)}")
+
 # Create session
 with requests.session() as s:
-    # Fetch gainers (Open = High)
-    gainers_df = fetch_stocks(s, gainers_url, "high")
-    gainers_df = filter_and_sort_stocks(gainers_df, nifty100_symbols, "gainers")
+    # Fetch gainers (Open = High) and losers (Open = Low) in one cycle
+    gainers_df, losers_df, failed_lists = fetch_stocks(s)
+    
+    # Store the raw snapshot for intraday / multi-day analysis
+    if SAVE_PARQUET_SNAPSHOTS:
+        try:
+            snapshot_file = SnapshotStore().append(gainers_df, losers_df)
+            if snapshot_file:
+                print(f"   [OK] Snapshot stored in {snapshot_file}")
+        except ImportError as e:
+            print(f"   [INFO] Snapshot store skipped: {e}")
+        except Exception as e:
+            print(f"   [WARNING] Could not store snapshot: {e}")
+    
+    # Split into every watched index in one vectorized pass (sorted by % change, best first)
+    gainers_by_index = split_by_index(gainers_df, index_membership, top_n=TOP_N)
+    losers_by_index = split_by_index(losers_df, index_membership, top_n=TOP_N)
+    gainers_df = gainers_by_index[PRIMARY_INDEX]
+    losers_df = losers_by_index[PRIMARY_INDEX]
+    print(f"\n[INFO] Filtered to {len(gainers_df)} gainers and {len(losers_df)} losers in {PRIMARY_INDEX}")
+    print(f"   [OK] Sorted by % Change (Highest to Lowest)")
     
-    # Fetch losers (Open = Low)
-    losers_df = fetch_stocks(s, losers_url, "low")
-    losers_df = filter_and_sort_stocks(losers_df, nifty100_symbols, "losers")
+    # Diff against the previous run's ranks (one lookup per stock, state kept in .chartink_last_snapshot.json)
+    changes_df = None
+    if REPORT_CHANGES:
+        differ = SnapshotDiffer()
+        differ.load()
+        run_id = datetime.now().isoformat(timespec='seconds')
+        # A failed fetch is not an empty list: keep its previous ranks as the baseline
+        gainer_diff = SnapshotDiff() if "gainers" in failed_lists else differ.update(f"{PRIMARY_INDEX}:gainers", run_id, gainers_df)
+        loser_diff = SnapshotDiff() if "losers" in failed_lists else differ.update(f"{PRIMARY_INDEX}:losers", run_id, losers_df)
+        if failed_lists:
+            print(f"   [WARNING] Keeping the previous snapshot for: {', '.join(sorted(failed_lists))}")
+        if len(failed_lists) < 2:
+            differ.save()
+        changes_df = pd.concat([gainer_diff.to_frame('Gainers'), loser_diff.to_frame('Losers')], ignore_index=True)
     
     # Display results
     print(f"\n{'='*60}")
@@ -159,6 +181,22 @@ with requests.session() as s:
     if not losers_df.empty:
         print(losers_df[['nsecode', 'name', 'per_chg', 'close', 'volume']].head(10).to_string(index=False))
     
+    # Other watched indices from the same fetch
+    for index_name in index_membership.names:
+        if index_name != PRIMARY_INDEX:
+            print(f"\n[{index_name.upper()}] Gainers: {len(gainers_by_index[index_name])} | Losers: {len(losers_by_index[index_name])}")
+    
+    # Changes since the previous run
+    if changes_df is not None:
+        print(f"\n[CHANGES] Since last run: {len(changes_df)} changes")
+        for list_name, diff in (("Gainers", gainer_diff), ("Losers", loser_diff)):
+            if diff.entered:
+                print(f"   {list_name} entered: {', '.join(diff.entered)}")
+            if diff.exited:
+                print(f"   {list_name} exited:  {', '.join(diff.exited)}")
+            if diff.moved:
+                print(f"   {list_name} moved:   {', '.join(f'{symbol} {diff.marker(symbol)}' for symbol in diff.moved)}")
+    
     # Prepare combined data with proper formatting
     output_file = "nifty100_gainers_losers.xlsx"
     print(f"\n{'='*60}")
@@ -192,113 +230,49 @@ with requests.session() as s:
         available_cols = [col for col in column_order if col in final_df.columns]
         final_df = final_df[available_cols]
         
-        try:
-            from openpyxl import load_workbook
-            from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-            from openpyxl.utils import get_column_letter
-            
-            # Save to Excel
-            final_df.to_excel(output_file, sheet_name='Gainers & Losers', index=False)
-            
-            # Apply formatting
-            wb = load_workbook(output_file)
-            ws = wb['Gainers & Losers']
-            
-            # Add timestamp and CSV info in first row (insert before data)
-            from datetime import datetime
-            import os
-            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S IST")
-            
-            # Get CSV file info
-            csv_file = "ind_nifty100list.csv"
-            csv_info = ""
-            if os.path.exists(csv_file):
-                csv_modified = datetime.fromtimestamp(os.path.getmtime(csv_file))
-                csv_info = f" | CSV: {len(nifty100_symbols)} stocks (updated: {csv_modified.strftime('%Y-%m-%d')})"
-            
-            ws.insert_rows(1)
-            timestamp_cell = ws.cell(row=1, column=1)
-            timestamp_cell.value = f"Last Updated: {timestamp}{csv_info}"
-            timestamp_cell.font = Font(bold=True, size=10, color="666666")
-            timestamp_cell.alignment = Alignment(horizontal='left', vertical='center')
-            # Merge cells for timestamp
-            ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=len(available_cols))
-            
-            # Header formatting
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            header_font = Font(bold=True, color="FFFFFF", size=11)
-            border = Border(
-                left=Side(style='thin'),
-                right=Side(style='thin'),
-                top=Side(style='thin'),
-                bottom=Side(style='thin')
-            )
-            
-            # Format header row (now row 2 because timestamp is in row 1)
-            for cell in ws[2]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                cell.border = border
-            
-            # Format data rows and add borders (start from row 3 because row 1 is timestamp, row 2 is header)
-            for row in ws.iter_rows(min_row=3, max_row=ws.max_row):
-                for cell in row:
-                    cell.border = border
-                    cell.alignment = Alignment(horizontal='left', vertical='center')
-            
-            # Auto-adjust column widths
-            for column in ws.columns:
-                max_length = 0
-                column_letter = get_column_letter(column[0].column)
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Add section headers formatting (if Section column exists)
-            if 'Section' in final_df.columns:
-                section_col_idx = available_cols.index('Section') + 1
-                current_section = None
-                # Start from row 3 (row 1 is timestamp, row 2 is header)
-                for row_idx, row in enumerate(ws.iter_rows(min_row=3, max_row=ws.max_row), start=3):
-                    section_value = ws.cell(row=row_idx, column=section_col_idx).value
-                    if section_value != current_section:
-                        current_section = section_value
-                        # Format section header row
-                        section_fill = PatternFill(start_color="D9E1F2", end_color="D9E1F2", fill_type="solid")
-                        section_font = Font(bold=True, size=10)
-                        for cell in ws[row_idx]:
-                            cell.fill = section_fill
-                            cell.font = section_font
-            
-            wb.save(output_file)
-            
-            print(f"\n[SUCCESS] Data saved to {output_file}")
-            print(f"   - Top Gainers: {len(gainers_df)} stocks")
-            print(f"   - Top Losers: {len(losers_df)} stocks")
-            print(f"   - Total: {len(final_df)} stocks in one sheet")
-            print(f"   - Formatting: Headers, borders, and auto-width applied")
+        from datetime import datetime
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S IST")
         
-        except PermissionError:
-            import datetime
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_file_timestamp = f"nifty100_gainers_losers_{timestamp}.xlsx"
-            print(f"\n[WARNING] {output_file} is open in Excel")
-            print(f"[OK] Saving to {output_file_timestamp} instead")
-            final_df.to_excel(output_file_timestamp, sheet_name='Gainers & Losers', index=False)
-        except Exception as e:
-            print(f"\n[WARNING] Could not apply advanced formatting: {e}")
-            print(f"   Saving with basic formatting...")
-            final_df.to_excel(output_file, sheet_name='Gainers & Losers', index=False)
-            print(f"   [OK] Saved to {output_file}")
+        # Get CSV file info
+        csv_file = "ind_nifty100list.csv"
+        csv_info = ""
+        if os.path.exists(csv_file):
+            csv_modified = datetime.fromtimestamp(os.path.getmtime(csv_file))
+            csv_info = f" | CSV: {len(nifty100_symbols)} stocks (updated: {csv_modified.strftime('%Y-%m-%d')})"
+        
+        # Excel gets the banner, headers, borders and section bands in one pass (widths from the DataFrame);
+        # other formats from CHARTINK_OUTPUT_FORMATS get the plain rows.
+        # Written on the background thread: temp file + atomic replace, retried while Excel has the file open
+        output_writer.submit(
+            final_df,
+            output_file,
+            sheet_name='Gainers & Losers',
+            banner=f"Last Updated: {timestamp}{csv_info}",
+            section_column='Section',
+            widths=column_widths(final_df),
+            changes=changes_df
+        )
+        
+        # [SUCCESS] (or an error) is printed by the writer once the files are in place
+        print(f"\n[INFO] Queued {output_file} for writing")
+        print(f"   - Top Gainers: {len(gainers_df)} stocks")
+        print(f"   - Top Losers: {len(losers_df)} stocks")
+        print(f"   - Total: {len(final_df)} stocks in one sheet")
+        
+        # Intraday history: this run's rows are appended, earlier runs are never rewritten
+        if APPEND_DAILY_HISTORY:
+            try:
+                history_file = DailyHistory().append(final_df)
+                print(f"   [OK] Appended {len(final_df)} rows to {history_file}")
+            except Exception as e:
+                print(f"   [WARNING] Could not append to daily history: {e}")
     else:
         print(f"\n[WARNING] No data to save")
 
+# Let queued output files finish before the script exits
+print(f"\n[INFO] Waiting for output files to finish writing...")
+output_writer.close()
+
 print(f"\n{'='*60}")
 print("COMPLETE!")
 print(f"{'='*60}")
@@ -0,0 +1,25 @@
+"""
+Output Format
+Value formatting shared by every file written from a result DataFrame
+(Excel, the other output sinks and the daily history)
+"""
+
+import numpy as np
+
+
+def quoted_values(column):
+    """
+    Undo float32 storage noise for output: 2.349999 -> 2.35
+
+    float32 columns (% change) are widened to float64 and rounded to 4
+    decimals, which float32 represents exactly for values below 1,000 (Chartink
+    quotes at most 2); any other column is returned unchanged.
+    """
+    dtype = getattr(column.dtype, 'numpy_dtype', column.dtype)
+    try:
+        is_float32 = np.dtype(dtype) == np.float32
+    except TypeError:
+        is_float32 = False
+    if is_float32:
+        return column.astype('float64').round(4)
+    return column
@@ -0,0 +1,242 @@
+"""
+Output Sinks
+Writes result DataFrames to the output formats chosen by configuration:
+Excel, Parquet, CSV, newline-delimited JSON and SQLite
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from output_format import quoted_values
+from excel_writer import write_styled_workbook
+
+# Formats written when none are passed (comma separated, e.g. "parquet,excel")
+# Override without editing code by setting CHARTINK_OUTPUT_FORMATS
+DEFAULT_OUTPUT_FORMATS = "excel"
+
+# Attempts to swap a finished file into place while another program has it open
+DEFAULT_LOCK_RETRIES = 10
+
+# Seconds between those attempts
+DEFAULT_RETRY_DELAY = 2
+
+# Write jobs the background writer holds before the oldest unstarted one is dropped
+DEFAULT_MAX_PENDING = 4
+
+
+class ExcelSink:
+    extension = ".xlsx"
+
+    def write(self, df, path, sheet_name='Sheet1', banner=None, section_column=None, widths=None, changes=None, **options):
+        """Write an .xlsx file, with the styled layout when a banner, sections or changes are given"""
+        if banner or section_column or widths or changes is not None:
+            try:
+                write_styled_workbook(df, path, sheet_name=sheet_name, banner=banner,
+                                      section_column=section_column, widths=widths, changes=changes)
+                return
+            except Exception as e:
+                print(f"[WARNING] Could not apply advanced formatting: {e}")
+                print(f"   Saving with basic formatting...")
+        df.apply(quoted_values).to_excel(path, sheet_name=sheet_name, index=False)
+
+
+class ParquetSink:
+    extension = ".parquet"
+
+    def write(self, df, path, **options):
+        """Write a columnar Parquet file (dtypes are kept as they are)"""
+        df.to_parquet(path, index=False)
+
+
+class CsvSink:
+    extension = ".csv"
+
+    def write(self, df, path, **options):
+        """Write a CSV file"""
+        df.apply(quoted_values).to_csv(path, index=False)
+
+
+class NdjsonSink:
+    extension = ".ndjson"
+
+    def write(self, df, path, **options):
+        """Write newline-delimited JSON, one record per row"""
+        df.apply(quoted_values).to_json(path, orient='records', lines=True)
+
+
+class SqliteSink:
+    extension = ".sqlite"
+
+    def write(self, df, path, target=None, **options):
+        """Write a SQLite database with one table named after the target file, replaced on every run"""
+        table = os.path.splitext(os.path.basename(target or path))[0]
+        with sqlite3.connect(path) as conn:
+            df.apply(quoted_values).to_sql(table, conn, if_exists='replace', index=False)
+        conn.close()
+
+
+SINKS = {
+    'excel': ExcelSink(),
+    'parquet': ParquetSink(),
+    'csv': CsvSink(),
+    'ndjson': NdjsonSink(),
+    'sqlite': SqliteSink(),
+}
+
+
+def configured_formats(formats=None):
+    """
+    Resolve the output formats to write
+
+    Args:
+        formats: Format names or a comma separated string (default: None,
+                 CHARTINK_OUTPUT_FORMATS or DEFAULT_OUTPUT_FORMATS)
+
+    Returns:
+        list: Known format names, Excel last (it is the slowest, and the one a
+              user is likely to have open)
+    """
+    if formats is None:
+        formats = os.environ.get("CHARTINK_OUTPUT_FORMATS", DEFAULT_OUTPUT_FORMATS)
+    if isinstance(formats, str):
+        formats = formats.split(",")
+
+    names = []
+    for name in formats:
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in SINKS:
+            print(f"[WARNING] Unknown output format '{name}' - skipped (available: {', '.join(SINKS)})")
+        elif name not in names:
+            names.append(name)
+    return sorted(names, key=lambda name: name == 'excel')
+
+
+def _replace_when_unlocked(tmp_path, path, retries, retry_delay):
+    """Atomically move a finished temp file over path, retrying while path is locked"""
+    for attempt in range(retries + 1):
+        try:
+            os.replace(tmp_path, path)
+            return True
+        except PermissionError:
+            if attempt == retries:
+                break
+            if attempt == 0:
+                print(f"[WARNING] {path} is locked (open in Excel?) - retrying every {retry_delay}s")
+            time.sleep(retry_delay)
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+    return False
+
+
+def write_outputs(df, output_file, formats=None, retries=DEFAULT_LOCK_RETRIES, retry_delay=DEFAULT_RETRY_DELAY, **options):
+    """
+    Write a DataFrame to every configured format
+
+    Each format gets its own extension on the output_file base name, e.g.
+    chartink_nifty100_stocks.xlsx -> chartink_nifty100_stocks.parquet.
+    Every file is written to a temp file first and atomically swapped into
+    place, so readers never see a half-written file. If the target is locked
+    by another program, the swap is retried; when it stays locked the
+    previous file is kept and that format is skipped for this run.
+
+    Args:
+        df: Results to write
+        output_file: Output path (its extension is replaced per format)
+        formats: Formats to write (default: None, see configured_formats)
+        retries: Swap attempts while a file is locked (default: DEFAULT_LOCK_RETRIES)
+        retry_delay: Seconds between attempts (default: DEFAULT_RETRY_DELAY)
+        **options: Excel layout options (sheet_name, banner, section_column, widths, changes)
+
+    Returns:
+        list: Paths written
+    """
+    base = os.path.splitext(output_file)[0]
+    written = []
+    for name in configured_formats(formats):
+        sink = SINKS[name]
+        path = base + sink.extension
+        # Same folder (so the replace is atomic) and same extension (writers pick their engine from it)
+        tmp_path = f"{base}.tmp-{os.getpid()}-{threading.get_ident()}{sink.extension}"
+        try:
+            # target is the final path, for sinks that name things after it (e.g. the SQLite table)
+            sink.write(df, tmp_path, target=path, **options)
+        except ImportError as e:
+            print(f"[WARNING] {name} output needs an optional package ({e}) - skipped")
+            continue
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if _replace_when_unlocked(tmp_path, path, retries, retry_delay):
+            written.append(path)
+        else:
+            print(f"[WARNING] {path} stayed locked - kept the previous file, it will be replaced next run")
+    return written
+
+
+class BackgroundWriter:
+    def __init__(self, max_pending=DEFAULT_MAX_PENDING):
+        """
+        Writes outputs on a background thread so fetch cycles never wait on disk or file locks
+
+        Jobs go into a bounded queue. When it is full, the oldest job that has
+        not started is dropped - a newer snapshot supersedes it anyway.
+
+        Args:
+            max_pending: Jobs queued before dropping the oldest (default: DEFAULT_MAX_PENDING)
+        """
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = threading.Thread(target=self._run, name="chartink-output-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, df, output_file, formats=None, **options):
+        """Queue a write_outputs call (returns immediately)"""
+        job = (df, output_file, formats, options)
+        while True:
+            try:
+                self._queue.put_nowait(job)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._queue.get_nowait()
+                    self._queue.task_done()
+                except queue.Empty:
+                    continue
+                if dropped is None:
+                    # close() was called - keep its stop marker and drop this job instead
+                    self._queue.put(None)
+                    print(f"[WARNING] Output writer is closed - {output_file} was not written")
+                    return
+                print(f"[WARNING] Output writer is behind - dropped an older write of {dropped[1]}")
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                df, output_file, formats, options = job
+                written = write_outputs(df, output_file, formats=formats, **options)
+                if written:
+                    print(f"[SUCCESS] Saved: {', '.join(written)}")
+                else:
+                    print(f"[ERROR] Nothing was written for {output_file}")
+            except Exception as e:
+                print(f"[ERROR] Could not write {job[1]}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued write has finished"""
+        self._queue.join()
+
+    def close(self):
+        """Finish queued writes and stop the thread (call before a script exits)"""
+        self._queue.put(None)
+        self._thread.join()
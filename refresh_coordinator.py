@@ -0,0 +1,217 @@
+"""
+Refresh Coordinator
+Single-flight fetching for the Streamlit dashboard: when many sessions ask for
+the same screener at once, only one upstream fetch runs and the rest wait for it.
+A background poller keeps the latest snapshot in memory during market hours so
+page renders never wait on Chartink.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+# Seconds a fetched result is served before it is fetched again
+DEFAULT_TTL = 180
+
+# NSE regular session in India Standard Time (no daylight saving, so a fixed offset works)
+IST = timezone(timedelta(hours=5, minutes=30))
+MARKET_OPEN = (9, 15)
+MARKET_CLOSE = (15, 30)
+
+
+class _InFlightCall:
+    """A fetch in progress that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RefreshCoordinator:
+    def __init__(self, ttl=DEFAULT_TTL):
+        """
+        Per-key result cache with single-flight refresh
+
+        Args:
+            ttl: Seconds a result stays fresh (default: DEFAULT_TTL)
+        """
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._results = {}
+        self._in_flight = {}
+
+    def get(self, key, fetch_fn, force=False):
+        """
+        Return the result for key, running fetch_fn at most once at a time per key
+
+        Args:
+            key: Cache key (e.g. (screener_url, condition_type))
+            fetch_fn: Zero-argument function that fetches a fresh result
+            force: Drop the cached result for this key only and fetch again; a fetch
+                   already in flight for the key is still shared (default: False)
+
+        Returns:
+            The cached or freshly fetched result
+        """
+        with self._lock:
+            if force:
+                self._results.pop(key, None)
+            cached = self._results.get(key)
+            if cached and time.time() - cached[0] < self.ttl:
+                return cached[1]
+            call = self._in_flight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._in_flight[key] = call
+
+        if not is_leader:
+            # Someone else is already fetching this key - share their result
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fetch_fn()
+            with self._lock:
+                self._results[key] = (time.time(), call.result)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def invalidate(self, key):
+        """Drop the cached result for one key (other keys are untouched)"""
+        with self._lock:
+            self._results.pop(key, None)
+
+
+class Snapshot:
+    """One successful poll result and when it was fetched"""
+
+    def __init__(self, data, fetched_at):
+        self.data = data
+        self.fetched_at = fetched_at
+
+    def age_seconds(self):
+        """Seconds since this snapshot was fetched"""
+        return time.time() - self.fetched_at
+
+
+def market_is_open(now=None):
+    """
+    Whether NSE's regular session is running (Mon-Fri, MARKET_OPEN to MARKET_CLOSE IST)
+
+    Exchange holidays are not known here; on those days the poller just keeps
+    getting the same data back.
+    """
+    now = now or datetime.now(IST)
+    if now.tzinfo is not None:
+        now = now.astimezone(IST)
+    if now.weekday() >= 5:
+        return False
+    return MARKET_OPEN <= (now.hour, now.minute) <= MARKET_CLOSE
+
+
+def _same_data(data, previous):
+    """Whether data is the very same object as previous (item by item for tuples)"""
+    if isinstance(data, tuple) and isinstance(previous, tuple) and len(data) == len(previous):
+        return all(item is old for item, old in zip(data, previous))
+    return data is previous
+
+
+class SnapshotPoller:
+    def __init__(self, fetch_fn, interval=DEFAULT_TTL, on_update=None, active_fn=market_is_open):
+        """
+        Background thread that keeps the latest snapshot up to date
+
+        Reads always return the last good snapshot straight from memory
+        (stale-while-revalidate); a failed or slow poll never replaces it.
+        Outside active hours the thread stays idle after its first poll, and
+        only explicit poll() calls (e.g. a refresh click) fetch.
+
+        Args:
+            fetch_fn: Called as fetch_fn(force=...) and returns fresh data (raises on failure).
+                      Returning the very same object(s) as the current snapshot's data
+                      means nothing new was fetched, and no snapshot is published.
+            interval: Seconds between polls (default: DEFAULT_TTL)
+            on_update: Called with each new Snapshot, e.g. to precompute derived results (default: None)
+            active_fn: Returns whether scheduled polls should run now (default: market_is_open;
+                       None polls around the clock)
+        """
+        self.fetch_fn = fetch_fn
+        self.interval = interval
+        self.on_update = on_update
+        self.active_fn = active_fn
+        self.last_error = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._publish_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the polling thread (no-op if it is already running)"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="chartink-snapshot-poller", daemon=True)
+                self._thread.start()
+        return self
+
+    def is_active(self):
+        """Whether scheduled polls run right now"""
+        return self.active_fn is None or self.active_fn()
+
+    def _run(self):
+        while True:
+            if self._snapshot is None or self.is_active():
+                self.poll()
+            time.sleep(self.interval)
+
+    def poll(self, force=False):
+        """
+        Fetch once; keep the previous snapshot if the fetch fails
+
+        Safe to call from any thread, e.g. for an on-demand refresh.
+
+        Args:
+            force: Passed on to fetch_fn, e.g. to bypass cached results (default: False)
+
+        Returns:
+            Snapshot: Latest snapshot (None if no poll has succeeded yet)
+        """
+        try:
+            data = self.fetch_fn(force=force)
+        except Exception as e:
+            print(f"[WARNING] Snapshot poll failed, serving last good data: {e}")
+            with self._lock:
+                self.last_error = e
+                return self._snapshot
+        # One publisher at a time, so concurrent polls sharing one fetch publish it once
+        with self._publish_lock:
+            current = self.latest()
+            if current is not None and _same_data(data, current.data):
+                # Served from a cache - the current snapshot is still the latest
+                with self._lock:
+                    self.last_error = None
+                return current
+            snapshot = Snapshot(data, time.time())
+            if self.on_update is not None:
+                try:
+                    self.on_update(snapshot)
+                except Exception as e:
+                    print(f"[WARNING] Snapshot update hook failed: {e}")
+            with self._lock:
+                self._snapshot = snapshot
+                self.last_error = None
+            return snapshot
+
+    def latest(self):
+        """Return the last good Snapshot (None before the first successful poll)"""
+        with self._lock:
+            return self._snapshot
@@ -0,0 +1,195 @@
+"""
+Scan Clause Discovery
+Helpers for finding, probing and caching a working Chartink scan clause
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import hashlib
+import json
+import os
+import re
+import time
+import requests
+from chartink_client import post_scan_clause, response_json
+
+# Upper bound on concurrent probe POSTs sent to Chartink
+DEFAULT_MAX_WORKERS = 4
+
+# Discovered clauses, keyed by screener URL
+DEFAULT_CLAUSE_CACHE_FILE = ".chartink_scan_clause_cache.json"
+
+# Scan clause / condition assignments in inline scripts (what page_fingerprint hashes)
+_CLAUSE_SOURCE_RE = re.compile(
+    r"""(?:scan[_\s]?clause|condition)["']?\s*[:=]\s*["'][^"']+["']""",
+    re.IGNORECASE,
+)
+
+
+def probe_scan_clause(session, csrf_token, scan_clause, timeout=10):
+    """
+    POST one candidate scan clause
+
+    Returns:
+        tuple: (scan_clause, data, error) - data is the JSON response when it has
+               at least one record, otherwise error describes why the probe failed
+    """
+    try:
+        response = post_scan_clause(session, csrf_token, scan_clause, timeout=timeout)
+    except requests.exceptions.RequestException as e:
+        return scan_clause, None, f"Request error: {e}"
+
+    if response.status_code != 200:
+        return scan_clause, None, f"HTTP {response.status_code}"
+
+    try:
+        data = response_json(response)
+    except ValueError:
+        return scan_clause, None, "Invalid JSON response"
+
+    if "scan_error" in data:
+        return scan_clause, None, f"[ERROR] Scan error: {data.get('scan_error', 'Unknown error')}"
+    if data.get("data") and len(data["data"]) > 0:
+        return scan_clause, data, None
+    return scan_clause, None, "No data (0 records)"
+
+
+def race_scan_clauses(session, csrf_token, clauses, timeout=10, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Probe candidate scan clauses concurrently; the highest-priority one returning data wins
+
+    Clauses are in priority order. All probes run in parallel, but a success is
+    only accepted once every clause ahead of it has failed, so a broader
+    fallback answering first can never beat a more specific clause listed
+    before it. Probes that have not started yet are cancelled as soon as the
+    winner is known (requests already on the wire finish in the background).
+
+    Args:
+        session: requests session holding the Chartink cookies
+        csrf_token: CSRF token from the screener page
+        clauses: Candidate scan clauses, best first
+        timeout: Per-request timeout in seconds (default: 10)
+        max_workers: Maximum concurrent probes (default: DEFAULT_MAX_WORKERS)
+
+    Returns:
+        tuple: (scan_clause, data) of the winner, or (None, None) if every probe failed
+    """
+    if not clauses:
+        return None, None
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(clauses)))
+    try:
+        futures = {
+            executor.submit(probe_scan_clause, session, csrf_token, clause, timeout): position
+            for position, clause in enumerate(clauses)
+        }
+        results = [None] * len(clauses)
+        for future in as_completed(futures):
+            clause, data, error = future.result()
+            results[futures[future]] = (clause, data)
+            if data:
+                print(f"   [OK] {clause[:60]} -> found {len(data['data'])} stocks")
+            else:
+                print(f"   {clause[:60]} -> {error}")
+            # Walk the priority order: stop at the first clause still running
+            for result in results:
+                if result is None:
+                    break
+                if result[1]:
+                    return result
+        return None, None
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def page_fingerprint(soup, csrf_token=None):
+    """
+    Fingerprint the scan-condition sources of a screener page
+
+    Only what clause discovery extracts a clause from is hashed: scan clause /
+    condition values assigned in inline scripts, plus scan/clause attributes
+    and hidden inputs. Timestamps, ads, counters and the rest of the page are
+    ignored, so the fingerprint only changes when the screener's condition does.
+
+    Args:
+        soup: BeautifulSoup of the screener page
+        csrf_token: Token to strip from the sources (default: None)
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    parts = []
+    for script in soup.find_all('script'):
+        if script.string:
+            parts.extend(match.group(0) for match in _CLAUSE_SOURCE_RE.finditer(script.string))
+    for element in soup.find_all(True):
+        for attr_name, attr_value in element.attrs.items():
+            if isinstance(attr_value, str) and ('scan' in attr_name.lower() or 'clause' in attr_name.lower()):
+                parts.append(f"{element.name}[{attr_name}]={attr_value}")
+    for inp in soup.find_all('input', {'type': 'hidden'}):
+        name = inp.get('name', '')
+        if 'scan' in name.lower() or 'clause' in name.lower():
+            parts.append(f"input[{name}]={inp.get('value', '')}")
+    content = re.sub(r'\s+', ' ', "\n".join(parts))
+    if csrf_token:
+        content = content.replace(csrf_token, "")
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class ScanClauseCache:
+    def __init__(self, cache_file=DEFAULT_CLAUSE_CACHE_FILE):
+        """
+        On-disk cache of discovered scan clauses
+
+        Args:
+            cache_file: JSON file holding one entry per screener URL
+        """
+        self.cache_file = cache_file
+        self.entries = self._load()
+
+    def _load(self):
+        """Load all cache entries from disk"""
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Could not read scan clause cache: {e}")
+        return {}
+
+    def _save(self):
+        """Write all cache entries to disk"""
+        try:
+            tmp_file = f"{self.cache_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2)
+            os.replace(tmp_file, self.cache_file)
+        except Exception as e:
+            print(f"[WARNING] Could not write scan clause cache: {e}")
+
+    def get(self, screener_url, fingerprint):
+        """
+        Look up the clause discovered for a screener
+
+        Returns:
+            dict: Entry with 'scan_clause' and 'strategy', or None if missing or
+                  the page fingerprint has changed since discovery
+        """
+        entry = self.entries.get(screener_url)
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry
+        return None
+
+    def store(self, screener_url, fingerprint, scan_clause, strategy):
+        """Remember a working clause and the strategy that found it"""
+        self.entries[screener_url] = {
+            "scan_clause": scan_clause,
+            "strategy": strategy,
+            "fingerprint": fingerprint,
+            "discovered_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        self._save()
+
+    def invalidate(self, screener_url):
+        """Forget the clause for a screener (e.g. after it returned a scan error)"""
+        if self.entries.pop(screener_url, None) is not None:
+            self._save()
@@ -0,0 +1,190 @@
+"""
+Snapshot Diff
+Which stocks entered, left or changed rank in the open=high / open=low lists
+since the previous snapshot. The previous snapshot is kept as an ordered
+array of nsecodes; the unchanged head and tail of the lists are skipped with
+vectorized comparisons, so the per-stock work grows with the size of the
+change, not with the length of the lists.
+"""
+
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from stock_ranking import resolve_schema
+
+# Where main_gainers_losers.py keeps the previous run's symbols between runs
+DEFAULT_STATE_FILE = ".chartink_last_snapshot.json"
+
+# Columns of SnapshotDiff.to_frame()
+CHANGE_COLUMNS = ['Change', 'List', 'nsecode', 'Rank', 'Previous Rank']
+
+
+def symbol_order(stock_list):
+    """Symbols of a list in its current order, each once (first occurrence wins)"""
+    if stock_list.empty:
+        return np.array([], dtype=str)
+    symbol_col = resolve_schema(stock_list).symbol
+    if symbol_col is None:
+        return np.array([], dtype=str)
+    symbols = stock_list[symbol_col].dropna().astype(str)
+    return np.asarray(pd.unique(symbols.to_numpy(dtype=object)), dtype=str)
+
+
+def _common_prefix(a, b):
+    """Length of the common leading run of two symbol arrays (one vectorized comparison)"""
+    length = min(len(a), len(b))
+    if length == 0:
+        return 0
+    mismatches = np.flatnonzero(a[:length] != b[:length])
+    return int(mismatches[0]) if len(mismatches) else length
+
+
+class SnapshotDiff:
+    def __init__(self, entered=None, exited=None, moved=None):
+        """
+        Changes in one list between two snapshots
+
+        Args:
+            entered: {symbol: rank} of stocks that joined the list
+            exited: {symbol: previous rank} of stocks that left it
+            moved: {symbol: (previous rank, rank, places)} of stocks that changed places
+                   with other stocks in both snapshots; places > 0 is up, and leaves out
+                   shifts caused only by entries and exits above the stock
+        """
+        self.entered = entered or {}
+        self.exited = exited or {}
+        self.moved = moved or {}
+
+    def __bool__(self):
+        return bool(self.entered or self.exited or self.moved)
+
+    def marker(self, symbol):
+        """Short label for a table cell: '🆕', '▲ 2', '▼ 1' or ''"""
+        if symbol in self.entered:
+            return "🆕"
+        if symbol in self.moved:
+            places = self.moved[symbol][2]
+            return f"▲ {places}" if places > 0 else f"▼ {-places}"
+        return ""
+
+    def to_frame(self, list_name):
+        """Rows for a 'Changes' report (columns: CHANGE_COLUMNS)"""
+        rows = [('Entered', list_name, symbol, rank, None) for symbol, rank in sorted(self.entered.items(), key=lambda item: item[1])]
+        rows += [('Exited', list_name, symbol, None, previous) for symbol, previous in sorted(self.exited.items(), key=lambda item: item[1])]
+        rows += [
+            ('Moved up' if places > 0 else 'Moved down', list_name, symbol, rank, previous)
+            for symbol, (previous, rank, places) in sorted(self.moved.items(), key=lambda item: item[1][1])
+        ]
+        return pd.DataFrame(rows, columns=CHANGE_COLUMNS).astype({'Rank': 'Int64', 'Previous Rank': 'Int64'})
+
+
+def diff_snapshots(previous, current):
+    """
+    Compare two ordered symbol arrays (see symbol_order), best first
+
+    The common leading and trailing runs are found with one vectorized
+    comparison each; only the window between them - the part that actually
+    changed - is walked in Python. A stock in both snapshots counts as moved
+    when its rank among the stocks in both changed, i.e. its rank change after
+    adjusting for entries and exits above it. One new entry at the top does
+    not move the stocks below it, while both stocks of a swap are reported.
+
+    Returns:
+        SnapshotDiff: entered, exited and moved stocks (ranks are 1-based)
+    """
+    prefix = _common_prefix(previous, current)
+    if prefix == len(previous) == len(current):
+        return SnapshotDiff()
+    suffix = _common_prefix(previous[prefix:][::-1], current[prefix:][::-1])
+
+    previous_ranks = {symbol: rank for rank, symbol in enumerate(previous[prefix:len(previous) - suffix].tolist(), start=prefix + 1)}
+    current_ranks = {symbol: rank for rank, symbol in enumerate(current[prefix:len(current) - suffix].tolist(), start=prefix + 1)}
+
+    entered = {symbol: rank for symbol, rank in current_ranks.items() if symbol not in previous_ranks}
+    exited = {symbol: rank for symbol, rank in previous_ranks.items() if symbol not in current_ranks}
+    # Rank among the stocks in both snapshots (the same offset for both, so the window's own order is enough)
+    stayed_before = [symbol for symbol in previous_ranks if symbol in current_ranks]
+    stayed_now = [symbol for symbol in current_ranks if symbol in previous_ranks]
+    position_before = {symbol: position for position, symbol in enumerate(stayed_before)}
+    moved = {}
+    for position, symbol in enumerate(stayed_now):
+        places = position_before[symbol] - position
+        if places:
+            moved[symbol] = (previous_ranks[symbol], current_ranks[symbol], places)
+    return SnapshotDiff(entered, exited, moved)
+
+
+class SnapshotDiffer:
+    def __init__(self):
+        """
+        Keeps the last snapshot of each list and diffs new snapshots against it
+
+        Thread-safe; one instance can be shared by every dashboard session.
+        """
+        self._lock = threading.Lock()
+        self._state = {}
+
+    def update(self, key, snapshot_id, stock_list):
+        """
+        Diff a list against the previous snapshot with the same key
+
+        Calling again with the same snapshot_id returns the same diff, so many
+        sessions rendering one snapshot all see the change since the one before.
+        A snapshot older than the stored one gets an empty diff and does not
+        move the baseline back.
+
+        Args:
+            key: Identifies the list, e.g. (index symbol set hash, 'gainers')
+            snapshot_id: Identifies the snapshot (e.g. its fetch time)
+            stock_list: The list, ranked (best first)
+
+        Returns:
+            SnapshotDiff: Changes since the previous snapshot (empty on the first one)
+        """
+        with self._lock:
+            entry = self._state.get(key)
+            if entry and entry['snapshot_id'] == snapshot_id:
+                return entry['diff']
+            if entry and snapshot_id < entry['snapshot_id']:
+                return SnapshotDiff()
+        current = symbol_order(stock_list)
+        with self._lock:
+            entry = self._state.get(key)
+            if entry and entry['snapshot_id'] == snapshot_id:
+                return entry['diff']
+            if entry and snapshot_id < entry['snapshot_id']:
+                return SnapshotDiff()
+            diff = diff_snapshots(entry['symbols'], current) if entry else SnapshotDiff()
+            self._state[key] = {'snapshot_id': snapshot_id, 'symbols': current, 'diff': diff}
+            return diff
+
+    def load(self, state_file=DEFAULT_STATE_FILE):
+        """Restore the previous symbols saved by an earlier run (missing or bad file = first run)"""
+        try:
+            if os.path.exists(state_file):
+                with open(state_file, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                with self._lock:
+                    for key, entry in saved.items():
+                        symbols = np.array(entry['symbols'], dtype=str)
+                        self._state[key] = {'snapshot_id': entry['snapshot_id'], 'symbols': symbols, 'diff': SnapshotDiff()}
+        except Exception as e:
+            print(f"[WARNING] Could not read previous snapshot: {e}")
+
+    def save(self, state_file=DEFAULT_STATE_FILE):
+        """Save the latest symbols for the next run (string keys only)"""
+        with self._lock:
+            saved = {
+                key: {'snapshot_id': entry['snapshot_id'], 'symbols': entry['symbols'].tolist()}
+                for key, entry in self._state.items()
+                if isinstance(key, str)
+            }
+        try:
+            tmp_file = f"{state_file}.tmp"
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            os.replace(tmp_file, state_file)
+        except Exception as e:
+            print(f"[WARNING] Could not save snapshot for the next run: {e}")
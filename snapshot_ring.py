@@ -0,0 +1,220 @@
+"""
+Snapshot Ring
+Fixed-capacity, in-memory history of the current trading day's gainers/losers
+snapshots for the dashboard. Everything lives in NumPy arrays allocated once, with symbols
+stored as small interned integer IDs, so memory stays the same no matter how
+long the server runs.
+"""
+
+import threading
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from refresh_coordinator import IST
+from stock_ranking import resolve_schema
+
+# Snapshots kept (160 x 3 minutes = 8 hours, a full trading day)
+DEFAULT_CAPACITY = 160
+
+# Stocks kept per list per snapshot (whole-market open=high lists stay well below this)
+DEFAULT_MAX_ROWS = 4096
+
+# Distinct symbols the interner can hold (NSE lists about 2,500 equities)
+DEFAULT_MAX_SYMBOLS = 8192
+
+# Position of each list in the arrays
+GAINERS, LOSERS = 0, 1
+
+
+def _fetch_times(times):
+    """Unix timestamps as an IST DatetimeIndex (not the server's local time)"""
+    return pd.to_datetime(times, unit='s', utc=True).tz_convert(IST).rename('fetched_at')
+
+
+class SymbolInterner:
+    def __init__(self, max_symbols=DEFAULT_MAX_SYMBOLS):
+        """
+        Maps symbols to dense integer IDs (0..max_symbols-1); -1 means unknown
+
+        Args:
+            max_symbols: Number of IDs available (default: DEFAULT_MAX_SYMBOLS)
+        """
+        self.max_symbols = max_symbols
+        self.ids = {}
+        self.names = np.empty(max_symbols, dtype=object)
+        self._full_warned = False
+
+    def intern(self, symbols):
+        """
+        IDs for a Series of symbols, assigning new IDs to symbols not seen before
+
+        Returns:
+            np.ndarray: int32 IDs (-1 for missing symbols, or once all IDs are used)
+        """
+        for symbol in pd.unique(symbols.dropna()):
+            if symbol in self.ids:
+                continue
+            if len(self.ids) >= self.max_symbols:
+                if not self._full_warned:
+                    print(f"[WARNING] Symbol table is full ({self.max_symbols}) - new symbols are not recorded")
+                    self._full_warned = True
+                break
+            self.names[len(self.ids)] = symbol
+            self.ids[symbol] = len(self.ids)
+        return self.lookup(symbols)
+
+    def lookup(self, symbols):
+        """IDs for a Series of symbols without assigning new ones"""
+        return symbols.map(self.ids).fillna(-1).to_numpy(dtype='int32')
+
+
+class SnapshotRing:
+    def __init__(self, capacity=DEFAULT_CAPACITY, max_rows=DEFAULT_MAX_ROWS, max_symbols=DEFAULT_MAX_SYMBOLS):
+        """
+        Ring buffer of the last `capacity` snapshots, preallocated up front
+
+        Args:
+            capacity: Snapshots kept before the oldest is overwritten (default: DEFAULT_CAPACITY)
+            max_rows: Stocks kept per list per snapshot (default: DEFAULT_MAX_ROWS)
+            max_symbols: Distinct symbols that can be recorded (default: DEFAULT_MAX_SYMBOLS)
+        """
+        self.capacity = capacity
+        self.max_rows = max_rows
+        self.interner = SymbolInterner(max_symbols)
+        self.fetched_at = np.zeros(capacity, dtype='float64')
+        self.counts = np.zeros((capacity, 2), dtype='int32')
+        self.symbol_ids = np.full((capacity, 2, max_rows), -1, dtype='int32')
+        self.per_chg = np.full((capacity, 2, max_rows), np.nan, dtype='float32')
+        # Prices stay float64: float32 would turn 9000.10 into 9000.0996
+        self.close = np.full((capacity, 2, max_rows), np.nan, dtype='float64')
+        self._next = 0
+        self._size = 0
+        self.trading_day = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._size
+
+    def _slots(self):
+        """Filled slots, oldest first"""
+        return (self._next - self._size + np.arange(self._size)) % self.capacity
+
+    def _rows(self, stock_list):
+        """(symbol IDs, per_chg, close) arrays of one list, at most max_rows long"""
+        rows = stock_list.head(self.max_rows)
+        schema = resolve_schema(rows) if not rows.empty else None
+        if schema is None or not schema.symbol:
+            return np.empty(0, dtype='int32'), np.empty(0, dtype='float32'), np.empty(0, dtype='float64')
+
+        def numeric(col, dtype):
+            if col is None:
+                return np.full(len(rows), np.nan, dtype=dtype)
+            return pd.to_numeric(rows[col], errors='coerce').to_numpy(dtype=dtype, na_value=np.nan)
+
+        return (self.interner.intern(rows[schema.symbol]),
+                numeric(schema.pct_change, 'float32'), numeric(schema.close, 'float64'))
+
+    def _same_as_last(self, lists):
+        """Whether the newest stored snapshot holds exactly these lists"""
+        if not self._size:
+            return False
+        last = (self._next - 1) % self.capacity
+        for position, (symbol_ids, per_chg, close) in enumerate(lists):
+            count = len(symbol_ids)
+            if (self.counts[last, position] != count
+                    or not np.array_equal(self.symbol_ids[last, position, :count], symbol_ids)
+                    or not np.array_equal(self.per_chg[last, position, :count], per_chg, equal_nan=True)
+                    or not np.array_equal(self.close[last, position, :count], close, equal_nan=True)):
+                return False
+        return True
+
+    def push(self, fetched_at, gainers_df, losers_df):
+        """
+        Record one snapshot, overwriting the oldest once the ring is full
+
+        The ring holds a single trading day: the first snapshot of a new day
+        (IST) clears it. A snapshot identical to the newest one (e.g. a poll
+        after the close) is not stored again.
+
+        Args:
+            fetched_at: Fetch time as a Unix timestamp (e.g. Snapshot.fetched_at)
+            gainers_df, losers_df: Lists as fetched
+
+        Returns:
+            bool: Whether the snapshot was stored
+        """
+        trading_day = datetime.fromtimestamp(fetched_at, IST).date()
+        with self._lock:
+            if trading_day != self.trading_day:
+                self._next = 0
+                self._size = 0
+                self.trading_day = trading_day
+            elif self._size and self.fetched_at[(self._next - 1) % self.capacity] >= fetched_at:
+                return False
+            lists = [self._rows(gainers_df), self._rows(losers_df)]
+            if self._same_as_last(lists):
+                return False
+            slot = self._next
+            self.fetched_at[slot] = fetched_at
+            for position, (symbol_ids, per_chg, close) in zip((GAINERS, LOSERS), lists):
+                count = len(symbol_ids)
+                self.counts[slot, position] = count
+                self.symbol_ids[slot, position] = -1
+                self.per_chg[slot, position] = np.nan
+                self.close[slot, position] = np.nan
+                self.symbol_ids[slot, position, :count] = symbol_ids
+                self.per_chg[slot, position, :count] = per_chg
+                self.close[slot, position, :count] = close
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            return True
+
+    def index_counts(self, symbol_index):
+        """
+        Gainers/losers of one index in every stored snapshot (e.g. for a sparkline)
+
+        Args:
+            symbol_index: symbol_index.SymbolIndex (or any collection of symbols)
+
+        Returns:
+            pd.DataFrame: 'Gainers' and 'Losers' columns indexed by fetch time (IST)
+        """
+        with self._lock:
+            slots = self._slots()
+            # Last entry stays False, so the -1 "no symbol" ID never counts
+            is_member = np.zeros(self.interner.max_symbols + 1, dtype=bool)
+            member_ids = [self.interner.ids[s] for s in getattr(symbol_index, 'members', symbol_index) if s in self.interner.ids]
+            is_member[member_ids] = True
+            counts = is_member[self.symbol_ids[slots]].sum(axis=2)
+            times = self.fetched_at[slots]
+        return pd.DataFrame(
+            {'Gainers': counts[:, GAINERS], 'Losers': counts[:, LOSERS]},
+            index=_fetch_times(times),
+        )
+
+    def symbol_history(self, symbol):
+        """
+        One stock through the stored snapshots
+
+        Returns:
+            pd.DataFrame: 'List' (Gainer / Loser / None), 'per_chg' and 'close'
+                          indexed by fetch time (IST)
+        """
+        with self._lock:
+            slots = self._slots()
+            times = self.fetched_at[slots]
+            symbol_id = self.interner.ids.get(symbol)
+            per_chg = np.full(len(slots), np.nan, dtype='float32')
+            close = np.full(len(slots), np.nan, dtype='float64')
+            in_list = np.full(len(slots), None, dtype=object)
+            if symbol_id is not None:
+                for position, label in ((LOSERS, 'Loser'), (GAINERS, 'Gainer')):
+                    hits = self.symbol_ids[slots, position] == symbol_id
+                    rows, columns = np.nonzero(hits)
+                    per_chg[rows] = self.per_chg[slots[rows], position, columns]
+                    close[rows] = self.close[slots[rows], position, columns]
+                    in_list[rows] = label
+        return pd.DataFrame(
+            {'List': in_list, 'per_chg': per_chg, 'close': close},
+            index=_fetch_times(times),
+        )
@@ -0,0 +1,192 @@
+"""
+Snapshot Store
+Date-partitioned Parquet store of every fetched gainers/losers snapshot
+(snapshots/date=YYYY-MM-DD/part-*.parquet). Reads of a time range or a set of
+symbols are pushed down to the files, so only matching days and row groups
+are loaded. Needs pyarrow.
+"""
+
+import os
+import uuid
+from datetime import datetime
+import pandas as pd
+from stock_ranking import resolve_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# Root folder of the store
+DEFAULT_STORE_DIR = "snapshots"
+
+# Columns stored for every stock in a snapshot
+SNAPSHOT_COLUMNS = ['fetched_at', 'type', 'nsecode', 'per_chg', 'close', 'volume']
+
+
+def _snapshot_schema():
+    return pa.schema([
+        ('fetched_at', pa.timestamp('ms')),
+        ('type', pa.string()),
+        ('nsecode', pa.string()),
+        ('per_chg', pa.float32()),
+        ('close', pa.float64()),
+        ('volume', pa.int64()),
+    ])
+
+
+def _snapshot_rows(stock_list, snapshot_type, fetched_at):
+    """One fetched list in store layout (columns found with resolve_schema)"""
+    schema = resolve_schema(stock_list)
+
+    def numeric(col, dtype):
+        if col is None:
+            return pd.Series(pd.NA, index=stock_list.index, dtype=dtype)
+        return pd.to_numeric(stock_list[col], errors='coerce').astype(dtype)
+
+    return pd.DataFrame({
+        'fetched_at': pd.Series(fetched_at, index=stock_list.index, dtype='datetime64[ms]'),
+        'type': snapshot_type,
+        'nsecode': stock_list[schema.symbol].astype('string') if schema.symbol else pd.NA,
+        'per_chg': numeric(schema.pct_change, 'float32'),
+        'close': numeric(schema.close, 'float64'),
+        'volume': numeric(schema.volume, 'Int64'),
+    })
+
+
+class SnapshotStore:
+    def __init__(self, directory=DEFAULT_STORE_DIR):
+        """
+        Append-only Parquet store partitioned by date
+
+        Args:
+            directory: Root folder of the store (default: DEFAULT_STORE_DIR)
+
+        Raises:
+            ImportError: If pyarrow is not installed
+        """
+        if pa is None:
+            raise ImportError("SnapshotStore needs pyarrow (pip install pyarrow)")
+        self.directory = directory
+        self.schema = _snapshot_schema()
+        self.partitioning = ds.partitioning(pa.schema([('date', pa.date32())]), flavor='hive')
+
+    def partition_dir(self, day):
+        """Folder holding one day's snapshots"""
+        return os.path.join(self.directory, f"date={day.strftime('%Y-%m-%d')}")
+
+    def _write(self, table, folder, name):
+        """Write a table into a partition via temp file + atomic rename"""
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, name)
+        tmp_path = os.path.join(folder, f".{name}.tmp")
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+        return path
+
+    def append(self, gainers_df, losers_df, fetched_at=None):
+        """
+        Store one snapshot (gainers and losers of the same fetch) as a new file
+
+        Args:
+            gainers_df: Open = High list as fetched
+            losers_df: Open = Low list as fetched
+            fetched_at: Fetch time (default: None, now)
+
+        Returns:
+            str: Path of the file written (None if both lists are empty)
+        """
+        fetched_at = fetched_at or datetime.now()
+        parts = [
+            _snapshot_rows(stock_list, snapshot_type, fetched_at)
+            for snapshot_type, stock_list in (('gainer', gainers_df), ('loser', losers_df))
+            if not stock_list.empty
+        ]
+        if not parts:
+            return None
+        # Sorted by symbol so per-file min/max statistics let symbol filters skip files
+        rows = pd.concat(parts, ignore_index=True).sort_values('nsecode', kind='stable')
+        table = pa.Table.from_pandas(rows, schema=self.schema, preserve_index=False)
+        name = f"part-{fetched_at.strftime('%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+        return self._write(table, self.partition_dir(fetched_at), name)
+
+    def _dataset(self):
+        """The whole store as one dataset (files still being written start with '.' and are skipped)"""
+        return ds.dataset(self.directory, format='parquet', partitioning=self.partitioning,
+                          schema=self.schema.append(pa.field('date', pa.date32())))
+
+    def read(self, start=None, end=None, symbols=None, types=None, columns=None):
+        """
+        Load the snapshots in a time range and/or for some symbols
+
+        Day folders outside the range are never opened, and the time and
+        symbol filters are evaluated by pyarrow against each file's
+        statistics before any rows are decoded.
+
+        Args:
+            start: Earliest fetch time, inclusive (default: None, no lower bound)
+            end: Latest fetch time, inclusive (default: None, no upper bound)
+            symbols: Only these NSE symbols (default: None, all)
+            types: 'gainer' and/or 'loser' (default: None, both)
+            columns: Columns to load (default: None, SNAPSHOT_COLUMNS)
+
+        Returns:
+            pd.DataFrame: Matching rows ordered by fetch time (empty if none)
+        """
+        columns = list(columns or SNAPSHOT_COLUMNS)
+        if not os.path.isdir(self.directory):
+            return pd.DataFrame(columns=columns)
+
+        condition = None
+
+        def both(expression):
+            return expression if condition is None else condition & expression
+
+        if start is not None:
+            condition = both(ds.field('date') >= pa.scalar(start.date(), pa.date32()))
+            condition = both(ds.field('fetched_at') >= pa.scalar(start, pa.timestamp('ms')))
+        if end is not None:
+            condition = both(ds.field('date') <= pa.scalar(end.date(), pa.date32()))
+            condition = both(ds.field('fetched_at') <= pa.scalar(end, pa.timestamp('ms')))
+        if symbols is not None:
+            condition = both(ds.field('nsecode').isin(list(symbols)))
+        if types is not None:
+            condition = both(ds.field('type').isin([types] if isinstance(types, str) else list(types)))
+
+        table = self._dataset().to_table(columns=columns, filter=condition)
+        # Keep volume as nullable integers instead of floats
+        result = table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
+        if 'fetched_at' in result.columns:
+            result = result.sort_values('fetched_at', kind='stable').reset_index(drop=True)
+        return result
+
+    def compact(self, day):
+        """
+        Merge one day's snapshot files into a single file sorted by symbol and time
+
+        Meant for finished days: fewer, larger files keep months of 3-minute
+        snapshots quick to scan.
+
+        Returns:
+            str: Path of the compacted file (None if the day has nothing to merge)
+        """
+        folder = self.partition_dir(day)
+        if not os.path.isdir(folder):
+            return None
+        day_file = f"day-{day.strftime('%Y%m%d')}.parquet"
+        files = sorted(
+            name for name in os.listdir(folder)
+            if name.endswith('.parquet') and (name.startswith('part-') or name == day_file)
+        )
+        if len(files) < 2:
+            return None
+        # Earlier compactions are merged too, so running this again never loses rows
+        table = ds.dataset([os.path.join(folder, name) for name in files], format='parquet', schema=self.schema).to_table()
+        table = table.sort_by([('nsecode', 'ascending'), ('fetched_at', 'ascending')])
+        path = self._write(table, folder, day_file)
+        for name in files:
+            if name != day_file:
+                os.remove(os.path.join(folder, name))
+        return path
@@ -0,0 +1,253 @@
+"""
+Stock Ranking
+Shared filtering and sorting of Chartink results by index membership and % change
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from symbol_index import IndexMembership
+
+# Distinct symbol sets (default CSV + uploads) kept by SharedRankings
+MAX_SHARED_SYMBOL_SETS = 32
+
+
+# Column names Chartink uses today for each role (checked before any guessing)
+KNOWN_COLUMNS = {
+    'symbol': ('nsecode',),
+    'pct_change': ('per_chg',),
+    'close': ('close',),
+    'volume': ('volume',),
+}
+
+# Substrings used to guess a role when the known name is missing
+FALLBACK_PATTERNS = {
+    'symbol': ('nsecode', 'symbol'),
+    'pct_change': ('chg', 'change', 'pct', '%'),
+    'close': ('close', 'price', 'ltp'),
+    'volume': ('volume', 'vol'),
+}
+
+# Roles that must hold numbers
+NUMERIC_ROLES = ('pct_change', 'close', 'volume')
+
+_schema_cache = {}
+
+
+class ColumnSchema:
+    def __init__(self, symbol=None, pct_change=None, close=None, volume=None):
+        """
+        Which column of a Chartink response plays which role (None if absent)
+
+        Args:
+            symbol: NSE symbol column
+            pct_change: Percentage change column
+            close: Close price column
+            volume: Volume column
+        """
+        self.symbol = symbol
+        self.pct_change = pct_change
+        self.close = close
+        self.volume = volume
+
+
+def _match_role(role, columns, taken):
+    """Find the column for a role: exact known name first, then substring guess"""
+    for name in KNOWN_COLUMNS[role]:
+        if name in columns and name not in taken:
+            return name
+    for col in columns:
+        col_lower = str(col).lower()
+        if col not in taken and any(pattern in col_lower for pattern in FALLBACK_PATTERNS[role]):
+            return col
+    return None
+
+
+def _build_schema(stock_list):
+    """Resolve and validate the column roles of one response"""
+    columns = list(stock_list.columns)
+    roles = {}
+    for role in KNOWN_COLUMNS:
+        col = _match_role(role, columns, set(roles.values()))
+        if col is not None and role in NUMERIC_ROLES:
+            # Validate once: a guessed column that holds no numbers is a wrong guess
+            sample = stock_list[col].head(20)
+            if sample.notna().any() and pd.to_numeric(sample, errors='coerce').notna().sum() == 0:
+                print(f"[WARNING] Column '{col}' does not hold numbers - not using it as {role}")
+                col = None
+        if col is not None:
+            roles[role] = col
+    return ColumnSchema(**roles)
+
+
+def resolve_schema(stock_list):
+    """
+    Return the ColumnSchema for a response, resolved once per column layout
+
+    Args:
+        stock_list: DataFrame fetched from Chartink
+
+    Returns:
+        ColumnSchema: Cached schema for this exact set and order of columns
+    """
+    key = tuple(stock_list.columns)
+    schema = _schema_cache.get(key)
+    if schema is None:
+        schema = _build_schema(stock_list)
+        # An empty response can't be validated - resolve it again next time
+        if not stock_list.empty:
+            _schema_cache[key] = schema
+    return schema
+
+
+def rank_positions(pct_values, top_n=None):
+    """
+    Order row positions by % change, best first, NaN last
+
+    With top_n, only the best top_n positions are returned, found by partial
+    selection (np.argpartition) instead of sorting every row.
+
+    Args:
+        pct_values: float64 NumPy array of % change values
+        top_n: Number of rows to keep (default: None, keep all)
+
+    Returns:
+        np.ndarray: Positions into pct_values
+    """
+    # Negate so the best value sorts first; NaN becomes +inf and sorts last
+    keys = np.where(np.isnan(pct_values), np.inf, -pct_values)
+    if top_n is not None and top_n < len(keys):
+        if top_n <= 0:
+            return np.empty(0, dtype=np.intp)
+        cutoff = np.partition(keys, top_n - 1)[top_n - 1]
+        # Everything strictly better than the cutoff, then the earliest rows tied with it,
+        # so the result matches the first top_n rows of a full stable sort
+        better = np.flatnonzero(keys < cutoff)
+        tied = np.flatnonzero(keys == cutoff)[:top_n - len(better)]
+        candidates = np.concatenate([better, tied])
+        candidates.sort()
+        return candidates[np.argsort(keys[candidates], kind='stable')]
+    return np.argsort(keys, kind='stable')
+
+
+def split_by_index(stock_list, membership, top_n=None):
+    """
+    Split one fetched universe into per-index lists in a single vectorized pass
+
+    Each list has the same format the scripts' old filter_and_sort_stocks
+    returned: rows for that index only, % change column numeric, sorted
+    descending (NaN last). A column that is already numeric keeps its dtype.
+    Only the rows that end up in a result are copied.
+
+    Args:
+        stock_list: DataFrame fetched from Chartink
+        membership: symbol_index.IndexMembership of the watched indices
+        top_n: Keep only the best top_n rows per index (default: None, keep all)
+
+    Returns:
+        dict: {index name: DataFrame}
+    """
+    if stock_list.empty:
+        return {name: stock_list for name in membership.names}
+
+    schema = resolve_schema(stock_list)
+    if schema.symbol:
+        # One membership lookup for every row
+        masks = membership.mask_series(stock_list[schema.symbol]).to_numpy()
+    else:
+        # Nothing to filter on - every row belongs to every index
+        masks = np.full(len(stock_list), (1 << len(membership.names)) - 1, dtype='int64')
+
+    # One numeric conversion shared by every index
+    pct_col = schema.pct_change
+    pct_values = None
+    # Already-typed columns (e.g. float32 from records_to_frame) are kept as they are
+    pct_is_numeric = bool(pct_col) and pd.api.types.is_numeric_dtype(stock_list[pct_col])
+    if pct_col:
+        pct_values = pd.to_numeric(stock_list[pct_col], errors='coerce').to_numpy(dtype='float64')
+
+    results = {}
+    for name in membership.names:
+        positions = np.flatnonzero(masks & membership.bit(name))
+        if pct_values is not None:
+            positions = positions[rank_positions(pct_values[positions], top_n)]
+        elif top_n is not None:
+            positions = positions[:max(top_n, 0)]
+        ranked = stock_list.iloc[positions].copy()
+        if pct_values is not None and not pct_is_numeric:
+            ranked[pct_col] = pct_values[positions]
+        results[name] = ranked
+    return results
+
+
+class SharedRankings:
+    def __init__(self, max_symbol_sets=MAX_SHARED_SYMBOL_SETS):
+        """
+        Per-refresh-cycle gainers/losers results shared by every dashboard user
+
+        Results are keyed by the symbol set's hash, so sessions viewing the same
+        index (or uploading identical CSVs) read one precomputed result.
+
+        Args:
+            max_symbol_sets: Symbol sets remembered for precomputation (default: MAX_SHARED_SYMBOL_SETS)
+        """
+        self.max_symbol_sets = max_symbol_sets
+        self._lock = threading.Lock()
+        self._symbol_sets = OrderedDict()
+        self._results = {}
+
+    def _remember(self, symbol_index):
+        self._symbol_sets[symbol_index.symbol_set_hash] = symbol_index
+        self._symbol_sets.move_to_end(symbol_index.symbol_set_hash)
+        while len(self._symbol_sets) > self.max_symbol_sets:
+            evicted, _ = self._symbol_sets.popitem(last=False)
+            self._results.pop(evicted, None)
+
+    def _compute(self, snapshot_id, symbol_indexes, gainers_df, losers_df):
+        """Split both lists for many symbol sets in one pass and store the results"""
+        membership = IndexMembership()
+        for symbol_index in symbol_indexes:
+            membership.add(symbol_index.symbol_set_hash, symbol_index)
+        gainers_by_set = split_by_index(gainers_df, membership)
+        losers_by_set = split_by_index(losers_df, membership)
+        results = {
+            key: (snapshot_id, gainers_by_set[key], losers_by_set[key])
+            for key in membership.names
+        }
+        with self._lock:
+            self._results.update(results)
+        return results
+
+    def precompute(self, snapshot_id, gainers_df, losers_df):
+        """
+        Recompute every remembered symbol set for a new snapshot (called by the poller)
+
+        Returns:
+            dict: {symbol set hash: (snapshot_id, gainers_df, losers_df)}
+        """
+        with self._lock:
+            symbol_indexes = list(self._symbol_sets.values())
+        results = {}
+        # IndexMembership holds up to 63 indices per pass
+        for start in range(0, len(symbol_indexes), 63):
+            results.update(self._compute(snapshot_id, symbol_indexes[start:start + 63], gainers_df, losers_df))
+        return results
+
+    def get(self, snapshot_id, symbol_index, gainers_df, losers_df):
+        """
+        Return (gainers_df, losers_df) for a symbol set, computing it only on a miss
+
+        Args:
+            snapshot_id: Identifies the refresh cycle (e.g. the snapshot's fetched_at)
+            symbol_index: symbol_index.SymbolIndex to filter to
+            gainers_df, losers_df: Raw lists of that snapshot (used on a miss)
+        """
+        key = symbol_index.symbol_set_hash
+        with self._lock:
+            self._remember(symbol_index)
+            cached = self._results.get(key)
+            if cached and cached[0] == snapshot_id:
+                return cached[1], cached[2]
+        result = self._compute(snapshot_id, [symbol_index], gainers_df, losers_df)[key]
+        return result[1], result[2]
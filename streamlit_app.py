@@ -1,9 +1,15 @@
 import streamlit as st
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup as bs
 import os
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from chartink_client import create_pooled_session, records_to_frame, response_json
+from csrf_cache import CsrfTokenCache
+from refresh_coordinator import RefreshCoordinator, SnapshotPoller
+from symbol_index import load_symbol_index
+from stock_ranking import SharedRankings
+from snapshot_ring import SnapshotRing
+from snapshot_diff import SnapshotDiffer
 
 # Page configuration - sidebar always expanded by default
 st.set_page_config(
@@ -18,9 +24,8 @@ st.set_page_config(
     }
 )
 
-# Auto-refresh every 3 minutes (180 seconds) with countdown
+# Countdown to the next data refresh (the data section refreshes itself as a fragment)
 st.markdown("""
-    <meta http-equiv="refresh" content="180">
     <script>
     // Countdown timer for auto-refresh
     let timeLeft = 180; // 3 minutes in seconds
@@ -291,100 +296,129 @@ api_url = "https://chartink.com/screener/process"
 gainers_url = "https://chartink.com/screener/copy-open-high-5911"
 losers_url = "https://chartink.com/screener/copy-open-low-103152"
 
-@st.cache_data(ttl=180)  # Cache for 3 minutes (auto-refresh)
-def fetch_stocks(screener_url, condition_type="high"):
-    """Fetch stocks from Chartink API"""
-    try:
-        with requests.session() as s:
-            # Get CSRF token
-            r_data = s.get(screener_url)
-            soup = bs(r_data.content, "lxml")
-            meta = soup.find("meta", {"name": "csrf-token"})["content"]
-            
-            # Determine scan clause
-            if condition_type == "high":
-                condition = {"scan_clause": "( latest open = latest high )"}
-            else:  # low
-                condition = {"scan_clause": "( latest open = latest low )"}
-            
-            # Fetch data
-            header = {"x-csrf-token": meta}
-            response = s.post(api_url, headers=header, data=condition, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if "data" in data and len(data["data"]) > 0:
-                    return pd.DataFrame(data["data"])
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error fetching data: {e}")
-        return pd.DataFrame()
+# Seconds one poll may take for both screeners together (requests still running
+# afterwards finish in the background and are shared by the next poll)
+FETCH_DEADLINE = 30
+
+@st.cache_resource
+def get_http_session():
+    """Keep-alive connection pool to chartink.com shared by every session on this server"""
+    return create_pooled_session()
+
+@st.cache_resource
+def get_token_cache():
+    """In-memory CSRF token cache shared by every session on this server"""
+    return CsrfTokenCache()
+
+@st.cache_resource
+def get_refresh_coordinator():
+    """Single-flight result cache per screener, shared by every session"""
+    return RefreshCoordinator()
+
+def fetch_stocks_from_api(session, token_cache, screener_url, condition_type="high"):
+    """Fetch stocks from Chartink API (raises on failure so the last good snapshot is kept)"""
+    # Determine scan clause
+    if condition_type == "high":
+        condition = {"scan_clause": "( latest open = latest high )"}
+    else:  # low
+        condition = {"scan_clause": "( latest open = latest low )"}
+    
+    # Fetch data (CSRF token is reused until it expires or Chartink returns 419)
+    response = token_cache.post(session, screener_url, condition["scan_clause"], timeout=30)
+    
+    if response is None:
+        raise RuntimeError("Could not get a CSRF token from Chartink")
+    if response.status_code != 200:
+        raise RuntimeError(f"Chartink API returned status code {response.status_code}")
+    data = response_json(response)
+    if "data" in data and len(data["data"]) > 0:
+        return records_to_frame(data["data"])
+    return pd.DataFrame()
+
+@st.cache_resource
+def get_shared_rankings():
+    """Filtered/sorted results per symbol set, computed once per refresh cycle for all users"""
+    return SharedRankings()
+
+@st.cache_resource
+def get_snapshot_ring():
+    """Today's snapshots in fixed-size memory, for the intraday history panel"""
+    return SnapshotRing()
+
+@st.cache_resource
+def get_snapshot_differ():
+    """Previous ranks per index and list, so every session highlights the same changes"""
+    return SnapshotDiffer()
+
+@st.cache_resource
+def get_snapshot_poller():
+    """Background poller keeping the latest gainers/losers snapshot for every session"""
+    # Resolve shared resources here - the poller thread runs outside any script run
+    coordinator = get_refresh_coordinator()
+    session = get_http_session()
+    token_cache = get_token_cache()
+    rankings = get_shared_rankings()
+    ring = get_snapshot_ring()
+    differ = get_snapshot_differ()
+    
+    def fetch_screener(screener_url, condition_type, force):
+        # One key per screener: a forced refresh drops only that screener's result,
+        # and refresh clicks from every session share whichever fetch is in flight
+        return coordinator.get(
+            (screener_url, condition_type),
+            lambda: fetch_stocks_from_api(session, token_cache, screener_url, condition_type),
+            force=force,
+        )
+    
+    def fetch_snapshot(force=False):
+        # Both screeners at once, so a poll costs the slower request, not the sum
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            futures = [
+                executor.submit(fetch_screener, gainers_url, "high", force),
+                executor.submit(fetch_screener, losers_url, "low", force),
+            ]
+            _, pending = wait(futures, timeout=FETCH_DEADLINE)
+            if pending:
+                raise TimeoutError(f"Chartink did not answer within {FETCH_DEADLINE} s")
+            return tuple(future.result() for future in futures)
+        finally:
+            executor.shutdown(wait=False)
+    
+    def on_snapshot(snapshot):
+        # Every index viewed recently is ready before any user asks for it,
+        # and diffed against the previous poll (not the previous render)
+        results = rankings.precompute(snapshot.fetched_at, *snapshot.data)
+        for symbol_set_hash, (_, gainers_df, losers_df) in results.items():
+            differ.update((symbol_set_hash, 'gainers'), snapshot.fetched_at, gainers_df)
+            differ.update((symbol_set_hash, 'losers'), snapshot.fetched_at, losers_df)
+        ring.push(snapshot.fetched_at, *snapshot.data)
+    
+    return SnapshotPoller(fetch_snapshot, interval=180, on_update=on_snapshot).start()
+
+def format_age(seconds):
+    """Format a snapshot age like '2m 05s'"""
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}m {seconds:02d}s" if minutes else f"{seconds}s"
 
 def load_stock_symbols_from_csv(csv_file, is_file_path=False):
-    """Load stock symbols from CSV file"""
+    """
+    Load stock symbols from CSV file (cached by file content, so reruns and re-uploads are free)
+    
+    Returns a SymbolIndex (supports len() and `in`), or [] if the CSV could not be loaded
+    """
     try:
         if csv_file is not None:
-            # If it's a file path (string), read from file
-            if is_file_path:
-                df = pd.read_csv(csv_file)
-            else:
-                # It's an uploaded file object
-                df = pd.read_csv(csv_file)
-            
-            # Try to find Symbol column (case insensitive)
-            symbol_col = None
-            for col in df.columns:
-                if 'symbol' in col.lower():
-                    symbol_col = col
-                    break
-            
-            if symbol_col is None:
-                st.error("CSV file must contain a 'Symbol' column")
-                return []
-            
-            # Extract and normalize symbols
-            symbols = df[symbol_col].str.strip().str.upper().str.replace('-', '').tolist()
-            symbols_original = df[symbol_col].str.strip().str.upper().tolist()
-            symbols = list(set(symbols + symbols_original))
-            symbols = [s for s in symbols if s and str(s) != 'NAN' and not pd.isna(s)]
-            
-            # Add ICICIPRULI if missing (common in Nifty 100)
-            if 'ICICIPRULI' not in symbols:
-                symbols.append('ICICIPRULI')
-            
-            return symbols
+            # File paths and uploaded file objects are both handled by the symbol index
+            return load_symbol_index(csv_file)
+        return []
+    except ValueError as e:
+        st.error(str(e))
         return []
     except Exception as e:
         st.error(f"Error loading CSV: {e}")
         return []
 
-def filter_and_sort_stocks(stock_list, symbols, condition_type="gainers"):
-    """Filter to index stocks and sort by percentage change"""
-    if stock_list.empty:
-        return stock_list
-    
-    # Find percentage change column
-    pct_col = None
-    for col in stock_list.columns:
-        col_lower = str(col).lower()
-        if 'chg' in col_lower or 'change' in col_lower or 'pct' in col_lower or '%' in col_lower:
-            pct_col = col
-            break
-    
-    # Filter to index stocks
-    if 'nsecode' in stock_list.columns and symbols:
-        filtered_stocks = stock_list[stock_list['nsecode'].isin(symbols)]
-        stock_list = filtered_stocks
-    
-    # Sort by percentage change
-    if pct_col:
-        stock_list = stock_list.copy()
-        stock_list[pct_col] = pd.to_numeric(stock_list[pct_col], errors='coerce')
-        # Sort descending (best first for gainers, highest first for losers)
-        stock_list = stock_list.sort_values(pct_col, ascending=False, na_position='last')
-    
-    return stock_list
-
 # Main App
 st.markdown('<h1 class="main-header">📈 Nifty Stock Screener - Gainers & Losers</h1>', unsafe_allow_html=True)
 
@@ -530,186 +564,248 @@ if not symbols:
     st.warning("⚠️ Please select an index to view stocks")
     st.stop()
 
-# Fetch data section with refresh button
-st.markdown("---")
-refresh_col1, refresh_col2, refresh_col3 = st.columns([1, 2, 1])
-
-with refresh_col2:
-    refresh_clicked = st.button("🔄 Refresh Data Now", type="primary", width='stretch')
-    if refresh_clicked:
-        st.cache_data.clear()
-        st.success("✅ Data refreshed! Reloading...")
-        st.rerun()
-
-with st.spinner("Fetching data from Chartink..."):
-    gainers_df = fetch_stocks(gainers_url, "high")
-    losers_df = fetch_stocks(losers_url, "low")
-    
-    # Filter and sort
-    gainers_df = filter_and_sort_stocks(gainers_df, symbols, "gainers")
-    losers_df = filter_and_sort_stocks(losers_df, symbols, "losers")
-
-# Display metrics with professional styling
-st.markdown("---")
-st.markdown("### 📊 Summary Statistics")
-metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
-
-with metric_col1:
-    st.metric(
-        label="📈 Index",
-        value=index_name,
-        delta=None
-    )
-
-with metric_col2:
-    st.metric(
-        label="🟢 Total Gainers",
-        value=len(gainers_df),
-        delta=None
-    )
-
-with metric_col3:
-    st.metric(
-        label="🔴 Total Losers",
-        value=len(losers_df),
-        delta=None
-    )
-
-with metric_col4:
-    total = len(gainers_df) + len(losers_df)
-    st.metric(
-        label="📊 Total Stocks",
-        value=total,
-        delta=None
-    )
-
-# Display tables side by side
-st.markdown("---")
-st.markdown('<div class="section-header">📊 Stock Analysis</div>', unsafe_allow_html=True)
-
-col1, col2 = st.columns(2)
-
-with col1:
-    st.markdown('<div class="section-header">🟢 Top Gainers (Open = High)</div>', unsafe_allow_html=True)
-    if not gainers_df.empty:
-        # Select columns to display
-        display_cols = ['nsecode', 'name', 'per_chg', 'close', 'volume']
-        available_cols = [col for col in display_cols if col in gainers_df.columns]
-        display_df = gainers_df[available_cols].copy()
+# Metrics and tables refresh on their own every 3 minutes without rerunning
+# the whole script (sidebar, CSV loading, styles are left untouched)
+@st.fragment(run_every=180)
+def render_live_data(symbols, index_name):
+    """Render the refresh button, metrics row, tables and downloads from the latest snapshot"""
+    # Fetch data section with refresh button
+    st.markdown("---")
+    refresh_col1, refresh_col2, refresh_col3 = st.columns([1, 2, 1])
+
+    with refresh_col2:
+        refresh_clicked = st.button("🔄 Refresh Data Now", type="primary", width='stretch')
+
+    # Renders read the poller's snapshot from memory; only the very first load
+    # (or an explicit refresh) waits for Chartink
+    poller = get_snapshot_poller()
+    snapshot = poller.latest()
+    if snapshot is None or refresh_clicked:
+        previous_fetch = snapshot.fetched_at if snapshot else None
+        with st.spinner("Fetching data from Chartink..."):
+            # A click always fetches again; clicks from other sessions at the
+            # same moment join that fetch instead of starting their own
+            snapshot = poller.poll(force=refresh_clicked)
+        if refresh_clicked and snapshot is not None:
+            if snapshot.fetched_at != previous_fetch:
+                st.success("✅ Data refreshed!")
+            else:
+                st.info(f"Data is already up to date (fetched {format_age(snapshot.age_seconds())} ago)")
+
+    if snapshot is None:
+        st.error(f"Error fetching data: {poller.last_error or 'Chartink did not respond'}")
+        return
+
+    gainers_df, losers_df = snapshot.data
+    data_time = datetime.fromtimestamp(snapshot.fetched_at)
+
+    # Serve the last good data when the upstream is slow, and say how old it is
+    if poller.last_error is not None or (poller.is_active() and snapshot.age_seconds() > 2 * poller.interval):
+        st.warning(f"⚠️ Chartink is slow or unreachable - showing last good data from {format_age(snapshot.age_seconds())} ago")
+    else:
+        market_note = "" if poller.is_active() else " - market closed, auto-refresh paused"
+        st.caption(f"📡 Data fetched at {data_time.strftime('%H:%M:%S')} ({format_age(snapshot.age_seconds())} ago){market_note}")
+
+    # Filter and sort - a lookup when this symbol set was already ranked for this snapshot
+    gainers_df, losers_df = get_shared_rankings().get(snapshot.fetched_at, symbols, gainers_df, losers_df)
+
+    # Entered / moved / exited since the previous poll - computed by the poller when the snapshot
+    # was published (an index viewed for the first time starts its baseline here)
+    differ = get_snapshot_differ()
+    gainer_diff = differ.update((symbols.symbol_set_hash, 'gainers'), snapshot.fetched_at, gainers_df)
+    loser_diff = differ.update((symbols.symbol_set_hash, 'losers'), snapshot.fetched_at, losers_df)
+
+    # Display metrics with professional styling
+    st.markdown("---")
+    st.markdown("### 📊 Summary Statistics")
+    metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
+
+    with metric_col1:
+        st.metric(
+            label="📈 Index",
+            value=index_name,
+            delta=None
+        )
+
+    with metric_col2:
+        st.metric(
+            label="🟢 Total Gainers",
+            value=len(gainers_df),
+            delta=None
+        )
+
+    with metric_col3:
+        st.metric(
+            label="🔴 Total Losers",
+            value=len(losers_df),
+            delta=None
+        )
+
+    with metric_col4:
+        total = len(gainers_df) + len(losers_df)
+        st.metric(
+            label="📊 Total Stocks",
+            value=total,
+            delta=None
+        )
+
+    # Intraday history from the in-memory snapshot ring (no disk reads)
+    ring = get_snapshot_ring()
+    if len(ring) > 1:
+        with st.expander("📈 Intraday History", expanded=False):
+            st.caption(f"{index_name} stocks in each list over the last {len(ring)} snapshots")
+            st.line_chart(ring.index_counts(symbols), height=200)
+
+            listed = sorted(set(gainers_df.get('nsecode', pd.Series(dtype=object)).dropna()) |
+                            set(losers_df.get('nsecode', pd.Series(dtype=object)).dropna()))
+            if listed:
+                history_symbol = st.selectbox("Stock", listed, key="history_symbol")
+                history = ring.symbol_history(history_symbol)
+                st.line_chart(history[['per_chg']], height=200)
+
+    # Display tables side by side
+    st.markdown("---")
+    st.markdown('<div class="section-header">📊 Stock Analysis</div>', unsafe_allow_html=True)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown('<div class="section-header">🟢 Top Gainers (Open = High)</div>', unsafe_allow_html=True)
+        if not gainers_df.empty:
+            # Select columns to display
+            display_cols = ['nsecode', 'name', 'per_chg', 'close', 'volume']
+            available_cols = [col for col in display_cols if col in gainers_df.columns]
+            display_df = gainers_df[available_cols].copy()
+
+            # Highlight stocks new to the list (🆕) or moved up/down (▲/▼ places) since the last snapshot
+            if gainer_diff and 'nsecode' in display_df.columns:
+                display_df.insert(0, 'change', display_df['nsecode'].astype(str).map(gainer_diff.marker))
         
-        # Format percentage change
-        if 'per_chg' in display_df.columns:
-            display_df['per_chg'] = display_df['per_chg'].apply(lambda x: f"{x:.2f}%" if pd.notna(x) else "N/A")
+            # Format percentage change
+            if 'per_chg' in display_df.columns:
+                display_df['per_chg'] = display_df['per_chg'].apply(lambda x: f"{x:.2f}%" if pd.notna(x) else "N/A")
         
-        # Format close price
-        if 'close' in display_df.columns:
-            display_df['close'] = display_df['close'].apply(lambda x: f"{x:,.2f}" if pd.notna(x) else "N/A")
+            # Format close price
+            if 'close' in display_df.columns:
+                display_df['close'] = display_df['close'].apply(lambda x: f"{x:,.2f}" if pd.notna(x) else "N/A")
         
-        # Format volume
-        if 'volume' in display_df.columns:
-            display_df['volume'] = display_df['volume'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
+            # Format volume
+            if 'volume' in display_df.columns:
+                display_df['volume'] = display_df['volume'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
         
-        # Rename columns for better display
-        display_df.columns = [col.upper().replace('_', ' ') for col in display_df.columns]
+            # Rename columns for better display
+            display_df.columns = [col.upper().replace('_', ' ') for col in display_df.columns]
         
-        # Display with better formatting
-        st.dataframe(
-            display_df,
-            width='stretch',
-            hide_index=True,
-            height=450
-        )
+            # Display with better formatting
+            st.dataframe(
+                display_df,
+                width='stretch',
+                hide_index=True,
+                height=450
+            )
         
-        # Download button
-        csv_gainers = gainers_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Gainers CSV",
-            data=csv_gainers,
-            file_name=f"{index_name}_gainers_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
-            width='stretch'
-        )
-    else:
-        st.info("No gainers found for this index")
-
-with col2:
-    st.markdown('<div class="section-header">🔴 Top Losers (Open = Low)</div>', unsafe_allow_html=True)
-    if not losers_df.empty:
-        # Select columns to display
-        display_cols = ['nsecode', 'name', 'per_chg', 'close', 'volume']
-        available_cols = [col for col in display_cols if col in losers_df.columns]
-        display_df = losers_df[available_cols].copy()
+            if gainer_diff.exited:
+                st.caption(f"Left the list: {', '.join(gainer_diff.exited)}")
+
+            # Download button
+            csv_gainers = gainers_df.to_csv(index=False)
+            st.download_button(
+                label="📥 Download Gainers CSV",
+                data=csv_gainers,
+                file_name=f"{index_name}_gainers_{datetime.now().strftime('%Y%m%d')}.csv",
+                mime="text/csv",
+                width='stretch'
+            )
+        else:
+            st.info("No gainers found for this index")
+
+    with col2:
+        st.markdown('<div class="section-header">🔴 Top Losers (Open = Low)</div>', unsafe_allow_html=True)
+        if not losers_df.empty:
+            # Select columns to display
+            display_cols = ['nsecode', 'name', 'per_chg', 'close', 'volume']
+            available_cols = [col for col in display_cols if col in losers_df.columns]
+            display_df = losers_df[available_cols].copy()
+
+            # Highlight stocks new to the list (🆕) or moved up/down (▲/▼ places) since the last snapshot
+            if loser_diff and 'nsecode' in display_df.columns:
+                display_df.insert(0, 'change', display_df['nsecode'].astype(str).map(loser_diff.marker))
         
-        # Format percentage change
-        if 'per_chg' in display_df.columns:
-            display_df['per_chg'] = display_df['per_chg'].apply(lambda x: f"{x:.2f}%" if pd.notna(x) else "N/A")
+            # Format percentage change
+            if 'per_chg' in display_df.columns:
+                display_df['per_chg'] = display_df['per_chg'].apply(lambda x: f"{x:.2f}%" if pd.notna(x) else "N/A")
         
-        # Format close price
-        if 'close' in display_df.columns:
-            display_df['close'] = display_df['close'].apply(lambda x: f"{x:,.2f}" if pd.notna(x) else "N/A")
+            # Format close price
+            if 'close' in display_df.columns:
+                display_df['close'] = display_df['close'].apply(lambda x: f"{x:,.2f}" if pd.notna(x) else "N/A")
         
-        # Format volume
-        if 'volume' in display_df.columns:
-            display_df['volume'] = display_df['volume'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
+            # Format volume
+            if 'volume' in display_df.columns:
+                display_df['volume'] = display_df['volume'].apply(lambda x: f"{int(x):,}" if pd.notna(x) else "N/A")
         
-        # Rename columns for better display
-        display_df.columns = [col.upper().replace('_', ' ') for col in display_df.columns]
+            # Rename columns for better display
+            display_df.columns = [col.upper().replace('_', ' ') for col in display_df.columns]
         
-        # Display with better formatting
-        st.dataframe(
-            display_df,
-            width='stretch',
-            hide_index=True,
-            height=450
-        )
+            # Display with better formatting
+            st.dataframe(
+                display_df,
+                width='stretch',
+                hide_index=True,
+                height=450
+            )
         
-        # Download button
-        csv_losers = losers_df.to_csv(index=False)
-        st.download_button(
-            label="📥 Download Losers CSV",
-            data=csv_losers,
-            file_name=f"{index_name}_losers_{datetime.now().strftime('%Y%m%d')}.csv",
-            mime="text/csv",
-            width='stretch'
-        )
-    else:
-        st.info("No losers found for this index")
+            if loser_diff.exited:
+                st.caption(f"Left the list: {', '.join(loser_diff.exited)}")
 
-# Combined download
-st.markdown("---")
-if not gainers_df.empty or not losers_df.empty:
-    col1, col2, col3 = st.columns([1, 2, 1])
-    with col2:
-        # Create combined dataframe
-        combined_data = []
-        if not gainers_df.empty:
-            gainers_copy = gainers_df.copy()
-            gainers_copy['Type'] = 'Gainer'
-            combined_data.append(gainers_copy)
-        if not losers_df.empty:
-            losers_copy = losers_df.copy()
-            losers_copy['Type'] = 'Loser'
-            combined_data.append(losers_copy)
-        
-        if combined_data:
-            combined_df = pd.concat(combined_data, ignore_index=True)
-            csv_combined = combined_df.to_csv(index=False)
+            # Download button
+            csv_losers = losers_df.to_csv(index=False)
             st.download_button(
-                label="📥 Download Combined Data (Gainers + Losers)",
-                data=csv_combined,
-                file_name=f"{index_name}_gainers_losers_{datetime.now().strftime('%Y%m%d')}.csv",
+                label="📥 Download Losers CSV",
+                data=csv_losers,
+                file_name=f"{index_name}_losers_{datetime.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv",
                 width='stretch'
             )
+        else:
+            st.info("No losers found for this index")
+
+    # Combined download
+    st.markdown("---")
+    if not gainers_df.empty or not losers_df.empty:
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col2:
+            # Create combined dataframe
+            combined_data = []
+            if not gainers_df.empty:
+                gainers_copy = gainers_df.copy()
+                gainers_copy['Type'] = 'Gainer'
+                combined_data.append(gainers_copy)
+            if not losers_df.empty:
+                losers_copy = losers_df.copy()
+                losers_copy['Type'] = 'Loser'
+                combined_data.append(losers_copy)
+        
+            if combined_data:
+                combined_df = pd.concat(combined_data, ignore_index=True)
+                csv_combined = combined_df.to_csv(index=False)
+                st.download_button(
+                    label="📥 Download Combined Data (Gainers + Losers)",
+                    data=csv_combined,
+                    file_name=f"{index_name}_gainers_losers_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv",
+                    width='stretch'
+                )
+
+    # Footer
+    st.markdown("---")
+    st.markdown("""
+    <div style='text-align: center; color: #666; padding: 2rem; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); border-radius: 8px; margin-top: 2rem;'>
+        <p style='font-size: 1.1rem; font-weight: 600; color: #2c3e50; margin-bottom: 0.5rem;'>📊 Data Source: Chartink API</p>
+        <p style='color: #666; margin: 0.25rem 0;'>🕐 Last updated: {}</p>
+        <p style='color: #666; margin: 0.25rem 0;'>🔄 Auto-refresh: Every 3 minutes</p>
+        <p style='color: #667eea; font-weight: 600; margin-top: 1rem;'>💡 Tip: Click 'Refresh Data' button for immediate update</p>
+    </div>
+    """.format(data_time.strftime("%Y-%m-%d %H:%M:%S")), unsafe_allow_html=True)
 
-# Footer
-st.markdown("---")
-st.markdown("""
-<div style='text-align: center; color: #666; padding: 2rem; background: linear-gradient(135deg, #f5f7fa 0%, #c3cfe2 100%); border-radius: 8px; margin-top: 2rem;'>
-    <p style='font-size: 1.1rem; font-weight: 600; color: #2c3e50; margin-bottom: 0.5rem;'>📊 Data Source: Chartink API</p>
-    <p style='color: #666; margin: 0.25rem 0;'>🕐 Last updated: {}</p>
-    <p style='color: #666; margin: 0.25rem 0;'>🔄 Auto-refresh: Every 3 minutes</p>
-    <p style='color: #667eea; font-weight: 600; margin-top: 1rem;'>💡 Tip: Click 'Refresh Data' button for immediate update</p>
-</div>
-""".format(datetime.now().strftime("%Y-%m-%d %H:%M:%S")), unsafe_allow_html=True)
 
+render_live_data(symbols, index_name)
@@ -0,0 +1,197 @@
+"""
+Symbol Index
+Loads index constituent CSVs (like ind_nifty100list.csv) into a normalized,
+cached membership structure keyed by the file's content hash
+"""
+
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+import pandas as pd
+
+# Symbols Chartink reports that are missing from the official CSVs
+EXTRA_SYMBOLS = ('ICICIPRULI',)
+
+# Number of distinct CSV contents kept in memory
+MAX_CACHED_INDEXES = 32
+
+_index_cache = OrderedDict()
+_path_hashes = {}
+_cache_lock = threading.Lock()
+
+
+class SymbolIndex:
+    def __init__(self, canonical, content_hash=None):
+        """
+        Normalized set of index symbols
+
+        Args:
+            canonical: Symbols as listed in the CSV (stripped, uppercased)
+            content_hash: SHA-256 of the CSV the index was built from (default: None)
+        """
+        self.content_hash = content_hash
+        self.canonical = tuple(dict.fromkeys(canonical))
+        # Chartink drops hyphens from some symbols (e.g. BAJAJ-AUTO -> BAJAJAUTO)
+        self.aliases = tuple(dict.fromkeys(
+            alias for alias in (s.replace('-', '') for s in self.canonical) if alias not in self.canonical
+        ))
+        members = set(self.canonical) | set(self.aliases)
+        members.update(EXTRA_SYMBOLS)
+        self.members = frozenset(members)
+        # Identifies the symbol set itself, so different CSVs with the same symbols share results
+        self.symbol_set_hash = hashlib.sha256("\n".join(sorted(self.members)).encode("utf-8")).hexdigest()
+        # List form for existing callers (len() and Series.isin)
+        self.symbols = sorted(self.members)
+
+    def __len__(self):
+        return len(self.members)
+
+    def __contains__(self, symbol):
+        return symbol in self.members
+
+    @classmethod
+    def from_dataframe(cls, df, content_hash=None):
+        """
+        Build an index from a CSV DataFrame with a 'Symbol' column (case insensitive)
+
+        Raises:
+            ValueError: If no Symbol column is found
+        """
+        symbol_col = None
+        for col in df.columns:
+            if 'symbol' in str(col).lower():
+                symbol_col = col
+                break
+        if symbol_col is None:
+            raise ValueError("CSV file must contain a 'Symbol' column")
+
+        symbols = df[symbol_col].dropna().astype(str).str.strip().str.upper()
+        symbols = symbols[(symbols != '') & (symbols != 'NAN')]
+        return cls(symbols.tolist(), content_hash=content_hash)
+
+
+def content_hash(data):
+    """SHA-256 hex digest of raw CSV bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def _read_source(source):
+    """Return raw bytes from a file path, uploaded file object or bytes"""
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            return f.read()
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    data = source.read()
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    return data
+
+
+def _path_hash(path):
+    """Content hash of a file, re-read only when its size or mtime changes"""
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _path_hashes.get(key[0])
+        if cached and cached[0] == key:
+            return cached[1], None
+    data = _read_source(path)
+    digest = content_hash(data)
+    with _cache_lock:
+        _path_hashes[key[0]] = (key, digest)
+    return digest, data
+
+
+def load_symbol_index(source):
+    """
+    Load a SymbolIndex, reusing the cached one when the CSV content is unchanged
+
+    Args:
+        source: CSV file path, Streamlit UploadedFile / file object, or raw bytes
+
+    Returns:
+        SymbolIndex: Cached or newly built index
+
+    Raises:
+        ValueError: If the CSV has no Symbol column
+    """
+    if isinstance(source, str):
+        digest, data = _path_hash(source)
+    else:
+        data = _read_source(source)
+        digest = content_hash(data)
+
+    with _cache_lock:
+        index = _index_cache.get(digest)
+        if index is not None:
+            _index_cache.move_to_end(digest)
+            return index
+
+    if data is None:
+        data = _read_source(source)
+    index = SymbolIndex.from_dataframe(pd.read_csv(io.BytesIO(data)), content_hash=digest)
+
+    with _cache_lock:
+        _index_cache[digest] = index
+        while len(_index_cache) > MAX_CACHED_INDEXES:
+            _index_cache.popitem(last=False)
+    return index
+
+
+class IndexMembership:
+    def __init__(self):
+        """
+        Membership table mapping each symbol to a bitmask of the indices it belongs to
+
+        Bit i is set when the symbol is in the i-th index added, so one fetched
+        universe can be split into every watched index in a single pass.
+        """
+        self.names = []
+        self.masks = {}
+
+    def add(self, name, symbol_index):
+        """Register an index (a SymbolIndex) under a display name"""
+        if len(self.names) >= 63:
+            raise ValueError("IndexMembership supports at most 63 indices")
+        bit = 1 << len(self.names)
+        self.names.append(name)
+        for symbol in symbol_index.members:
+            self.masks[symbol] = self.masks.get(symbol, 0) | bit
+
+    def bit(self, name):
+        """Bit value for an index name"""
+        return 1 << self.names.index(name)
+
+    def mask_series(self, symbols):
+        """Vectorized lookup: Series of symbols -> int64 Series of index bitmasks (0 = in none)"""
+        return symbols.map(self.masks).fillna(0).astype('int64')
+
+
+def load_index_membership(index_csv_files):
+    """
+    Build an IndexMembership from {index name: CSV path}, skipping missing files
+
+    Every skipped index is reported, so a missing download shows up in the log
+    instead of the index silently disappearing from the output.
+
+    Args:
+        index_csv_files: Mapping of index display name to constituent CSV path
+
+    Returns:
+        IndexMembership: Table covering every CSV that could be loaded
+    """
+    membership = IndexMembership()
+    for name, csv_file in index_csv_files.items():
+        if not os.path.exists(csv_file):
+            print(f"[WARNING] Skipping {name}: {csv_file} not found (see UPDATE_CSV_GUIDE.md)")
+            continue
+        try:
+            membership.add(name, load_symbol_index(csv_file))
+        except Exception as e:
+            print(f"[WARNING] Could not load {name} from {csv_file}: {e}")
+    return membership
@@ -0,0 +1,70 @@
+import pandas as pd
+
+import chartink_client
+from chartink_client import records_to_frame, response_to_dataframe, split_combined_result
+
+
+def test_split_combined_result_splits_on_open_high_low():
+    stock_list = pd.DataFrame({
+        'nsecode': ['UP', 'DOWN', 'FLAT', 'MID'],
+        'open': [10.0, 20.0, 5.0, 7.0],
+        'high': [10.0, 22.0, 5.0, 8.0],
+        'low': [9.0, 20.0, 5.0, 6.0],
+    })
+
+    gainers_df, losers_df = split_combined_result(stock_list)
+
+    assert gainers_df['nsecode'].tolist() == ['UP', 'FLAT']
+    assert losers_df['nsecode'].tolist() == ['DOWN', 'FLAT']
+    assert list(gainers_df.index) == [0, 1]
+
+
+def test_split_combined_result_without_prices_returns_none():
+    assert split_combined_result(pd.DataFrame({'nsecode': ['A'], 'per_chg': [1.0]})) is None
+
+
+def test_split_combined_result_empty():
+    gainers_df, losers_df = split_combined_result(pd.DataFrame())
+    assert gainers_df.empty and losers_df.empty
+
+
+def test_records_to_frame_keeps_price_precision():
+    records = [{'nsecode': 'A', 'per_chg': 2.35, 'close': 9000.1, 'volume': 5}]
+
+    df = records_to_frame(records, arrow=False)
+
+    assert df['close'].iloc[0] == 9000.1
+    assert df['volume'].dtype == 'int64'
+
+
+def test_records_to_frame_coerces_only_unclean_columns():
+    records = [
+        {'nsecode': 'A', 'per_chg': '2.35', 'close': 10.0, 'volume': None, 'extra': 1},
+        {'nsecode': 'B', 'per_chg': 'n/a', 'close': 20.0, 'volume': 7, 'extra': 2},
+    ]
+
+    df = records_to_frame(records, arrow=False)
+
+    assert list(df.columns) == ['nsecode', 'per_chg', 'close', 'volume']
+    assert df['per_chg'].dtype == 'float32'
+    assert round(float(df['per_chg'].iloc[0]), 4) == 2.35 and pd.isna(df['per_chg'].iloc[1])
+    assert df['volume'].dtype == 'Int64'
+    assert df['nsecode'].tolist() == ['A', 'B']
+
+
+class _Response:
+    def __init__(self, status_code, data=None):
+        self.status_code = status_code
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_response_to_dataframe_tells_failure_from_empty_screen(monkeypatch):
+    monkeypatch.setattr(chartink_client, 'USE_FAST_JSON', False)
+
+    assert response_to_dataframe(_Response(500)) is None
+    assert response_to_dataframe(None) is None
+    empty = response_to_dataframe(_Response(200, {'data': []}))
+    assert empty is not None and empty.empty
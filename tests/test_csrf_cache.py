@@ -0,0 +1,73 @@
+import requests
+
+import csrf_cache
+from csrf_cache import CsrfTokenCache
+
+
+class _Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def fake_tokens(monkeypatch):
+    """Make every screener page download hand out the next token: t1, t2, ..."""
+    fetched = []
+
+    def get_csrf_token(session, screener_url, timeout=30):
+        fetched.append(screener_url)
+        return f"t{len(fetched)}"
+
+    monkeypatch.setattr(csrf_cache, 'get_csrf_token', get_csrf_token)
+    return fetched
+
+
+def test_token_is_reused_within_ttl_and_refetched_after(monkeypatch):
+    fetched = fake_tokens(monkeypatch)
+    cache = CsrfTokenCache(ttl=60)
+    session = requests.Session()
+
+    assert cache.get_token(session, 'url') == 't1'
+    assert cache.get_token(session, 'url') == 't1'
+    assert len(fetched) == 1
+
+    cache._entry['fetched_at'] -= 61
+    assert cache.get_token(session, 'url') == 't2'
+
+
+def test_refresh_reuses_a_token_another_caller_already_refreshed(monkeypatch):
+    fetched = fake_tokens(monkeypatch)
+    cache = CsrfTokenCache()
+    session = requests.Session()
+    stale = cache.get_token(session, 'url')
+
+    assert cache.refresh(session, 'url', stale_token=stale) == 't2'
+    assert cache.refresh(session, 'url', stale_token=stale) == 't2'
+    assert len(fetched) == 2
+
+
+def test_disk_cache_survives_a_new_instance_with_cookies(monkeypatch, tmp_path):
+    fake_tokens(monkeypatch)
+    cache_file = str(tmp_path / 'csrf.json')
+    session = requests.Session()
+    session.cookies.set('ci_session', 'abc', domain='chartink.com', path='/')
+    CsrfTokenCache(cache_file=cache_file).get_token(session, 'url')
+
+    fresh_session = requests.Session()
+    assert CsrfTokenCache(cache_file=cache_file).get_token(fresh_session, 'url') == 't1'
+    assert fresh_session.cookies.get('ci_session') == 'abc'
+
+
+def test_post_refreshes_once_on_419(monkeypatch):
+    fake_tokens(monkeypatch)
+    posted = []
+
+    def post_scan_clause(session, token, scan_clause, timeout=30):
+        posted.append(token)
+        return _Response(419 if token == 't1' else 200)
+
+    monkeypatch.setattr(csrf_cache, 'post_scan_clause', post_scan_clause)
+
+    response = CsrfTokenCache().post(requests.Session(), 'url', '( latest open = latest high )')
+
+    assert response.status_code == 200
+    assert posted == ['t1', 't2']
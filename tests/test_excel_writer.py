@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from excel_writer import write_styled_workbook
+from snapshot_diff import diff_snapshots
+
+
+def sample_frame():
+    return pd.DataFrame({
+        'Section': ['Gainers', 'Gainers', 'Losers'],
+        'nsecode': ['TCS', 'INFY', 'SBIN'],
+        'per_chg': [2.5, np.nan, -1.25],
+    })
+
+
+def test_write_styled_workbook_layout(tmp_path):
+    output_file = tmp_path / 'out.xlsx'
+
+    write_styled_workbook(sample_frame(), output_file, banner='Updated 10:00')
+
+    ws = load_workbook(output_file)['Gainers & Losers']
+    assert ws['A1'].value == 'Updated 10:00'
+    assert [str(r) for r in ws.merged_cells.ranges] == ['A1:C1']
+    assert [cell.value for cell in ws[2]] == ['Section', 'nsecode', 'per_chg']
+    assert ws['A2'].style == 'header'
+    # First row of every section is highlighted, the rest are plain data rows
+    assert [ws.cell(row=row, column=1).style for row in (3, 4, 5)] == ['section', 'data', 'section']
+    # Missing values become empty cells
+    assert ws['C4'].value is None
+    assert ws['C5'].value == -1.25
+
+
+def test_write_styled_workbook_without_banner(tmp_path):
+    output_file = tmp_path / 'out.xlsx'
+
+    write_styled_workbook(sample_frame(), output_file, sheet_name='Data')
+
+    ws = load_workbook(output_file)['Data']
+    assert ws['A1'].value == 'Section'
+    assert not ws.merged_cells.ranges
+
+
+def test_write_styled_workbook_uses_given_widths(tmp_path):
+    output_file = tmp_path / 'out.xlsx'
+
+    write_styled_workbook(sample_frame(), output_file, widths=[12, 30, 9])
+
+    ws = load_workbook(output_file).active
+    assert [ws.column_dimensions[letter].width for letter in 'ABC'] == [12, 30, 9]
+
+
+def test_write_styled_workbook_changes_block(tmp_path):
+    output_file = tmp_path / 'out.xlsx'
+    previous = np.array(['TCS', 'INFY'], dtype=str)
+    current = np.array(['INFY', 'TCS', 'SBIN'], dtype=str)
+    changes = diff_snapshots(previous, current).to_frame('Gainers')
+
+    write_styled_workbook(sample_frame(), output_file, changes=changes)
+
+    ws = load_workbook(output_file).active
+    # Data ends on row 4, then a blank row, the block title and its header
+    assert ws['A6'].value == 'Changes since last run'
+    assert [cell.value for cell in ws[7]] == ['Change', 'List', 'nsecode', 'Rank', 'Previous Rank']
+    assert [ws.cell(row=row, column=1).value for row in (8, 9, 10)] == ['Entered', 'Moved up', 'Moved down']
+    assert ws['E8'].value is None
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pandas as pd
+
+from history_store import DailyHistory
+
+
+def test_append_and_read_back_each_run(tmp_path):
+    history = DailyHistory(directory=str(tmp_path))
+    first_run = datetime(2026, 10, 16, 9, 30)
+    second_run = datetime(2026, 10, 16, 9, 33)
+    history.append(pd.DataFrame({'nsecode': ['A', 'B'], 'per_chg': [1.5, 2.5]}), run_at=first_run)
+    history.append(pd.DataFrame({'nsecode': ['C'], 'per_chg': [3.5]}), run_at=second_run)
+
+    runs = history.runs(first_run)
+    assert runs['rows'].tolist() == [2, 1]
+    assert runs['offset'].iloc[1] == runs['offset'].iloc[0] + runs['length'].iloc[0]
+
+    assert history.read(run_at=first_run)['nsecode'].tolist() == ['A', 'B']
+    assert history.read(run_at=second_run)['nsecode'].tolist() == ['C']
+    assert history.read(first_run)['nsecode'].tolist() == ['A', 'B', 'C']
+
+
+def test_later_runs_use_first_runs_columns(tmp_path):
+    history = DailyHistory(directory=str(tmp_path))
+    run_at = datetime(2026, 10, 16, 10, 0)
+    history.append(pd.DataFrame({'nsecode': ['A'], 'per_chg': [1.0]}), run_at=run_at)
+    history.append(pd.DataFrame({'nsecode': ['B'], 'extra': [1]}), run_at=run_at.replace(minute=3))
+
+    second = history.read(run_at=run_at.replace(minute=3))
+
+    assert list(second.columns) == ['nsecode', 'per_chg']
+    assert second['per_chg'].isna().all()
+
+
+def test_read_missing_day_is_empty(tmp_path):
+    assert DailyHistory(directory=str(tmp_path)).read(datetime(2026, 1, 1)).empty
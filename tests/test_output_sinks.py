@@ -0,0 +1,49 @@
+import os
+import sqlite3
+
+import pandas as pd
+
+import output_sinks
+from output_sinks import write_outputs
+
+
+def test_write_outputs_replaces_files_and_leaves_no_temp_files(tmp_path):
+    output_file = str(tmp_path / 'nifty100_gainers_losers.xlsx')
+    (tmp_path / 'nifty100_gainers_losers.csv').write_text('old\n')
+    df = pd.DataFrame({'nsecode': ['A', 'B'], 'per_chg': [1.5, 2.5]})
+
+    written = write_outputs(df, output_file, formats='csv,excel')
+
+    assert written == [str(tmp_path / 'nifty100_gainers_losers.csv'), output_file]
+    assert pd.read_csv(written[0])['nsecode'].tolist() == ['A', 'B']
+    assert sorted(os.listdir(tmp_path)) == ['nifty100_gainers_losers.csv', 'nifty100_gainers_losers.xlsx']
+
+
+def test_sqlite_table_is_named_after_the_output_file(tmp_path):
+    output_file = str(tmp_path / 'nifty100_gainers_losers.xlsx')
+    for per_chg in (1.0, 2.0):
+        write_outputs(pd.DataFrame({'nsecode': ['A'], 'per_chg': [per_chg]}), output_file, formats='sqlite')
+
+    with sqlite3.connect(str(tmp_path / 'nifty100_gainers_losers.sqlite')) as conn:
+        tables = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+        rows = conn.execute("SELECT per_chg FROM nifty100_gainers_losers").fetchall()
+    conn.close()
+
+    assert tables == ['nifty100_gainers_losers']
+    assert rows == [(2.0,)]
+
+
+def test_locked_target_keeps_previous_file(tmp_path, monkeypatch):
+    output_file = str(tmp_path / 'out.xlsx')
+    (tmp_path / 'out.csv').write_text('nsecode\nOLD\n')
+
+    def locked(src, dst):
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(output_sinks.os, 'replace', locked)
+
+    written = write_outputs(pd.DataFrame({'nsecode': ['NEW']}), output_file, formats='csv', retries=1, retry_delay=0)
+
+    assert written == []
+    assert (tmp_path / 'out.csv').read_text() == 'nsecode\nOLD\n'
+    assert os.listdir(tmp_path) == ['out.csv']
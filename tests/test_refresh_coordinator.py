@@ -0,0 +1,165 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from refresh_coordinator import IST, RefreshCoordinator, SnapshotPoller, market_is_open
+
+
+def counting_fetch(result='data', release=None):
+    """Fetch function that counts its calls and optionally blocks until released"""
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        if release is not None:
+            release.wait(5)
+        return f"{result}{len(calls)}"
+
+    return fetch, calls
+
+
+def test_concurrent_callers_share_one_fetch():
+    release = threading.Event()
+    fetch, calls = counting_fetch(release=release)
+    coordinator = RefreshCoordinator(ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(coordinator.get('key', fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['data1'] * 5
+
+
+def test_result_is_reused_within_ttl_and_fetched_again_after():
+    fetch, calls = counting_fetch()
+    coordinator = RefreshCoordinator(ttl=60)
+
+    assert coordinator.get('key', fetch) == 'data1'
+    assert coordinator.get('key', fetch) == 'data1'
+    coordinator._results['key'] = (time.time() - 61, 'data1')
+    assert coordinator.get('key', fetch) == 'data2'
+    assert len(calls) == 2
+
+
+def test_force_fetches_again_for_that_key_only():
+    gainers, gainer_calls = counting_fetch('g')
+    losers, loser_calls = counting_fetch('l')
+    coordinator = RefreshCoordinator(ttl=60)
+    coordinator.get('gainers', gainers)
+    coordinator.get('losers', losers)
+
+    assert coordinator.get('gainers', gainers, force=True) == 'g2'
+    assert coordinator.get('losers', losers) == 'l1'
+    assert len(gainer_calls) == 2
+    assert len(loser_calls) == 1
+
+
+def test_forced_callers_still_join_a_fetch_in_flight():
+    release = threading.Event()
+    fetch, calls = counting_fetch(release=release)
+    coordinator = RefreshCoordinator(ttl=60)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(coordinator.get('key', fetch, force=True)))
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == ['data1'] * 3
+
+
+def test_invalidate_drops_one_key():
+    fetch, calls = counting_fetch()
+    coordinator = RefreshCoordinator(ttl=60)
+    coordinator.get('a', fetch)
+    coordinator.get('b', fetch)
+
+    coordinator.invalidate('a')
+
+    assert coordinator.get('a', fetch) == 'data3'
+    assert coordinator.get('b', fetch) == 'data2'
+
+
+def test_failed_fetch_is_raised_and_not_cached():
+    coordinator = RefreshCoordinator(ttl=60)
+
+    def fail():
+        raise RuntimeError('down')
+
+    with pytest.raises(RuntimeError):
+        coordinator.get('key', fail)
+    assert coordinator.get('key', lambda: 'ok') == 'ok'
+
+
+def test_market_is_open_uses_ist_session_hours():
+    assert market_is_open(datetime(2026, 10, 14, 9, 15, tzinfo=IST))
+    assert market_is_open(datetime(2026, 10, 14, 15, 30, tzinfo=IST))
+    assert not market_is_open(datetime(2026, 10, 14, 9, 14, tzinfo=IST))
+    assert not market_is_open(datetime(2026, 10, 14, 15, 31, tzinfo=IST))
+    # Saturday
+    assert not market_is_open(datetime(2026, 10, 17, 11, 0, tzinfo=IST))
+    # 04:00 UTC is 09:30 IST
+    assert market_is_open(datetime(2026, 10, 14, 4, 0, tzinfo=timezone.utc))
+
+
+def test_failed_poll_keeps_the_last_snapshot():
+    results = iter(['first'])
+
+    def fetch(force=False):
+        return next(results)
+
+    poller = SnapshotPoller(fetch, active_fn=None)
+    first = poller.poll()
+    assert poller.poll() is first
+    assert isinstance(poller.last_error, StopIteration)
+    assert poller.latest().data == 'first'
+
+
+def test_poll_passes_force_through():
+    seen = []
+
+    def fetch(force=False):
+        seen.append(force)
+        return (object(), object())
+
+    poller = SnapshotPoller(fetch, active_fn=None)
+    poller.poll()
+    poller.poll(force=True)
+
+    assert seen == [False, True]
+
+
+def test_concurrent_polls_sharing_one_fetch_publish_once():
+    release = threading.Event()
+    gainers, calls = counting_fetch('g', release=release)
+    coordinator = RefreshCoordinator(ttl=60)
+    published = []
+
+    def fetch(force=False):
+        return (coordinator.get('gainers', gainers, force=force), 'losers')
+
+    poller = SnapshotPoller(fetch, on_update=published.append, active_fn=None)
+    threads = [threading.Thread(target=poller.poll, kwargs={'force': True}) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert len(published) == 1
+    assert poller.latest().data == ('g1', 'losers')
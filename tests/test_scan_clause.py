@@ -0,0 +1,50 @@
+import time
+
+from bs4 import BeautifulSoup
+
+import scan_clause
+from scan_clause import page_fingerprint, race_scan_clauses
+
+
+def fake_probes(monkeypatch, outcomes):
+    """outcomes: {clause: (seconds until the answer, returns data)}"""
+    def probe_scan_clause(session, csrf_token, clause, timeout=10):
+        delay, has_data = outcomes[clause]
+        time.sleep(delay)
+        if has_data:
+            return clause, {'data': [{'nsecode': 'A'}]}, None
+        return clause, None, 'No data (0 records)'
+
+    monkeypatch.setattr(scan_clause, 'probe_scan_clause', probe_scan_clause)
+
+
+def test_earlier_clause_wins_even_when_a_later_one_answers_first(monkeypatch):
+    fake_probes(monkeypatch, {'nifty100': (0.2, True), 'all stocks': (0.0, True)})
+    assert race_scan_clauses(None, 'token', ['nifty100', 'all stocks'])[0] == 'nifty100'
+
+
+def test_later_clause_wins_once_every_earlier_one_failed(monkeypatch):
+    fake_probes(monkeypatch, {'a': (0.1, False), 'b': (0.2, True), 'c': (0.0, True)})
+    assert race_scan_clauses(None, 'token', ['a', 'b', 'c'])[0] == 'b'
+
+
+def test_no_winner_when_every_probe_fails(monkeypatch):
+    fake_probes(monkeypatch, {'a': (0.0, False), 'b': (0.0, False)})
+    assert race_scan_clauses(None, 'token', ['a', 'b']) == (None, None)
+    assert race_scan_clauses(None, 'token', []) == (None, None)
+
+
+PAGE = """<html><body><p>Updated 10:01</p>
+<div id="scan" data-scan-clause="( {nifty100} ( latest open = latest high ) )"></div>
+<script>var now = 123; var scan_clause = "( latest open = latest high )";</script>
+</body></html>"""
+
+
+def test_fingerprint_ignores_dynamic_page_content():
+    dynamic = PAGE.replace('10:01', '10:05').replace('now = 123', 'now = 999')
+    changed = PAGE.replace('latest high )";', 'latest low )";')
+
+    fingerprint = page_fingerprint(BeautifulSoup(PAGE, 'lxml'))
+
+    assert page_fingerprint(BeautifulSoup(dynamic, 'lxml')) == fingerprint
+    assert page_fingerprint(BeautifulSoup(changed, 'lxml')) != fingerprint
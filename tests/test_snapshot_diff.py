@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from snapshot_diff import SnapshotDiffer, diff_snapshots
+
+
+def symbols(*names):
+    return np.array(names, dtype=str)
+
+
+def test_entry_at_the_top_does_not_move_the_rest():
+    diff = diff_snapshots(symbols('A', 'B', 'C'), symbols('X', 'A', 'B', 'C'))
+    assert (diff.entered, diff.exited, diff.moved) == ({'X': 1}, {}, {})
+
+
+def test_entries_and_exits_together():
+    diff = diff_snapshots(symbols('A', 'B', 'C', 'D'), symbols('X', 'A', 'B', 'C'))
+    assert (diff.entered, diff.exited, diff.moved) == ({'X': 1}, {'D': 4}, {})
+
+
+def test_both_sides_of_a_swap_are_moved():
+    diff = diff_snapshots(symbols('RELIANCE', 'TCS', 'INFY'), symbols('TCS', 'RELIANCE', 'INFY'))
+    assert diff.moved == {'TCS': (2, 1, 1), 'RELIANCE': (1, 2, -1)}
+    assert diff.marker('TCS') == '▲ 1'
+    assert diff.marker('RELIANCE') == '▼ 1'
+    assert diff.marker('INFY') == ''
+
+
+def test_jump_to_the_top_moves_the_stocks_it_passed():
+    diff = diff_snapshots(symbols('A', 'B', 'C', 'D', 'E'), symbols('D', 'A', 'B', 'C', 'E'))
+    assert diff.moved == {'D': (4, 1, 3), 'A': (1, 2, -1), 'B': (2, 3, -1), 'C': (3, 4, -1)}
+    assert diff.marker('D') == '▲ 3'
+    assert diff.marker('E') == ''
+
+
+def test_moves_are_adjusted_for_entries_and_exits_above():
+    diff = diff_snapshots(symbols('Z', 'A', 'B'), symbols('X', 'Y', 'B', 'A'))
+    assert (diff.entered, diff.exited) == ({'X': 1, 'Y': 2}, {'Z': 1})
+    # B keeps rank 3 only because two stocks entered above it; it passed A
+    assert diff.moved == {'B': (3, 3, 1), 'A': (2, 4, -1)}
+    changes = diff.to_frame('Gainers')
+    assert changes.loc[changes['nsecode'] == 'B', 'Change'].item() == 'Moved up'
+
+
+def test_identical_and_empty_snapshots():
+    assert not diff_snapshots(symbols('A', 'B'), symbols('A', 'B'))
+    assert diff_snapshots(symbols(), symbols('A')).entered == {'A': 1}
+    assert diff_snapshots(symbols('A'), symbols()).exited == {'A': 1}
+
+
+def test_differ_caches_per_snapshot_and_ignores_older_ones(tmp_path):
+    differ = SnapshotDiffer()
+    differ.update('gainers', 1.0, pd.DataFrame({'nsecode': ['A', 'B']}))
+    diff = differ.update('gainers', 2.0, pd.DataFrame({'nsecode': ['B', 'A', 'C']}))
+
+    assert differ.update('gainers', 2.0, pd.DataFrame()) is diff
+    assert not differ.update('gainers', 1.5, pd.DataFrame({'nsecode': ['Z']}))
+
+    state_file = str(tmp_path / 'state.json')
+    differ.save(state_file)
+    restored = SnapshotDiffer()
+    restored.load(state_file)
+    assert restored.update('gainers', 3.0, pd.DataFrame({'nsecode': ['B', 'A']})).exited == {'C': 3}
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pandas as pd
+
+from refresh_coordinator import IST
+from snapshot_ring import SnapshotRing
+
+MORNING = datetime(2026, 10, 16, 10, 0, tzinfo=IST).timestamp()
+
+
+def gainers(pct):
+    return pd.DataFrame({'nsecode': ['A', 'B'], 'per_chg': [pct, 1.0], 'close': [100.0, 50.0]})
+
+
+def test_ring_wraps_around_keeping_the_newest_snapshots():
+    ring = SnapshotRing(capacity=3, max_rows=8, max_symbols=16)
+    for step in range(5):
+        assert ring.push(MORNING + step * 180, gainers(float(step)), pd.DataFrame())
+
+    history = ring.symbol_history('A')
+
+    assert len(ring) == 3
+    assert history['per_chg'].tolist() == [2.0, 3.0, 4.0]
+    assert history.index.is_monotonic_increasing
+    assert ring.index_counts(['A', 'B'])['Gainers'].tolist() == [2, 2, 2]
+
+
+def test_unchanged_or_repeated_snapshots_are_skipped():
+    ring = SnapshotRing(capacity=3, max_rows=8, max_symbols=16)
+    assert ring.push(MORNING, gainers(2.0), pd.DataFrame())
+    assert not ring.push(MORNING, gainers(3.0), pd.DataFrame())
+    assert not ring.push(MORNING + 180, gainers(2.0), pd.DataFrame())
+    assert len(ring) == 1
+
+
+def test_new_trading_day_starts_over():
+    ring = SnapshotRing(capacity=3, max_rows=8, max_symbols=16)
+    ring.push(MORNING, gainers(2.0), pd.DataFrame())
+    ring.push(MORNING + 180, gainers(3.0), pd.DataFrame())
+
+    ring.push(datetime(2026, 10, 19, 9, 20, tzinfo=IST).timestamp(), gainers(2.0), pd.DataFrame())
+
+    assert len(ring) == 1
+
+
+def test_history_keeps_price_precision_and_ist_times():
+    ring = SnapshotRing(capacity=3, max_rows=8, max_symbols=16)
+    ring.push(MORNING, pd.DataFrame({'nsecode': ['A'], 'per_chg': [1.0], 'close': [9000.1]}), pd.DataFrame())
+
+    history = ring.symbol_history('A')
+
+    assert history['close'].iloc[0] == 9000.1
+    assert history.index[0] == pd.Timestamp(2026, 10, 16, 10, 0, tz=IST)
+    assert history.index[0].hour == 10
+    assert ring.index_counts(['A']).index.equals(history.index)
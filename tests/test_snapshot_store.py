@@ -0,0 +1,73 @@
+import os
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from snapshot_store import SnapshotStore
+
+
+def stock_list(symbols, close=100.0):
+    return pd.DataFrame({
+        'nsecode': symbols,
+        'per_chg': [1.5] * len(symbols),
+        'close': [close] * len(symbols),
+        'volume': [1000] * len(symbols),
+    })
+
+
+def filled_store(tmp_path):
+    store = SnapshotStore(str(tmp_path / 'snapshots'))
+    store.append(stock_list(['TCS', 'INFY']), stock_list(['SBIN']), datetime(2026, 10, 14, 9, 30))
+    store.append(stock_list(['TCS']), stock_list([]), datetime(2026, 10, 14, 9, 33))
+    store.append(stock_list(['RELIANCE'], close=9000.1), stock_list([]), datetime(2026, 10, 15, 9, 30))
+    return store
+
+
+def test_append_writes_one_file_per_snapshot_in_day_folders(tmp_path):
+    store = filled_store(tmp_path)
+
+    assert len(os.listdir(store.partition_dir(datetime(2026, 10, 14)))) == 2
+    assert store.append(stock_list([]), stock_list([])) is None
+
+
+def test_read_filters_by_time_symbol_and_type(tmp_path):
+    store = filled_store(tmp_path)
+
+    day = store.read(start=datetime(2026, 10, 14), end=datetime(2026, 10, 14, 23, 59))
+    assert len(day) == 4
+    assert day['fetched_at'].is_monotonic_increasing
+
+    tcs = store.read(symbols=['TCS'])
+    assert tcs['fetched_at'].tolist() == [pd.Timestamp(2026, 10, 14, 9, 30), pd.Timestamp(2026, 10, 14, 9, 33)]
+
+    losers = store.read(types='loser', columns=['nsecode'])
+    assert losers['nsecode'].tolist() == ['SBIN']
+
+
+def test_read_keeps_price_precision_and_integer_volume(tmp_path):
+    store = filled_store(tmp_path)
+
+    rows = store.read(symbols=['RELIANCE'])
+
+    assert rows['close'].iloc[0] == 9000.1
+    assert rows['volume'].dtype == 'Int64'
+
+
+def test_read_empty_store(tmp_path):
+    assert SnapshotStore(str(tmp_path / 'missing')).read().empty
+
+
+def test_compact_merges_a_day_without_losing_rows(tmp_path):
+    store = filled_store(tmp_path)
+    day = datetime(2026, 10, 14)
+    before = store.read()
+
+    path = store.compact(day)
+
+    assert os.listdir(store.partition_dir(day)) == [os.path.basename(path)]
+    assert store.read().equals(before)
+    # Nothing left to merge
+    assert store.compact(day) is None
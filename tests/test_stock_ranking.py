@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from stock_ranking import SharedRankings, rank_positions, resolve_schema
+from symbol_index import SymbolIndex
+
+
+def test_rank_positions_orders_best_first_with_nan_last():
+    values = np.array([1.0, np.nan, 3.0, 2.0])
+    assert rank_positions(values).tolist() == [2, 3, 0, 1]
+
+
+def test_rank_positions_top_n_matches_full_stable_sort():
+    rng = np.random.default_rng(0)
+    values = rng.integers(-5, 5, size=200).astype('float64')
+    values[::17] = np.nan
+    full = rank_positions(values)
+    for top_n in (1, 5, 50, 199):
+        assert rank_positions(values, top_n=top_n).tolist() == full[:top_n].tolist()
+
+
+def test_rank_positions_top_n_edges():
+    values = np.array([1.0, 2.0])
+    assert rank_positions(values, top_n=0).tolist() == []
+    assert rank_positions(values, top_n=5).tolist() == [1, 0]
+
+
+def test_resolve_schema_known_columns():
+    schema = resolve_schema(pd.DataFrame({'nsecode': ['A'], 'per_chg': [1.0], 'close': [2.0], 'volume': [3]}))
+    assert (schema.symbol, schema.pct_change, schema.close, schema.volume) == ('nsecode', 'per_chg', 'close', 'volume')
+
+
+def test_resolve_schema_guesses_and_rejects_non_numeric():
+    stock_list = pd.DataFrame({'Symbol': ['A'], 'Change %': ['n/a'], 'LTP': [10.5]})
+
+    schema = resolve_schema(stock_list)
+
+    assert schema.symbol == 'Symbol'
+    assert schema.pct_change is None
+    assert schema.close == 'LTP'
+
+
+def test_shared_rankings_reuse_results_within_a_snapshot():
+    rankings = SharedRankings()
+    index = SymbolIndex(['A', 'B'])
+    gainers = pd.DataFrame({'nsecode': ['A', 'Z', 'B'], 'per_chg': [1.0, 5.0, 2.0]})
+    losers = pd.DataFrame({'nsecode': ['B'], 'per_chg': [-1.0]})
+
+    first = rankings.get(1, index, gainers, losers)
+    again = rankings.get(1, index, pd.DataFrame(), pd.DataFrame())
+
+    assert first[0]['nsecode'].tolist() == ['B', 'A']
+    assert again[0] is first[0] and again[1] is first[1]
+    # A new snapshot is computed from the lists passed in
+    assert rankings.get(2, index, pd.DataFrame(), pd.DataFrame())[0].empty
+
+
+def test_shared_rankings_precompute_covers_every_remembered_set():
+    rankings = SharedRankings()
+    big, bank = SymbolIndex(['A', 'B']), SymbolIndex(['B'])
+    empty = pd.DataFrame({'nsecode': [], 'per_chg': []})
+    rankings.get(1, big, empty, empty)
+    rankings.get(1, bank, empty, empty)
+    gainers = pd.DataFrame({'nsecode': ['A', 'B'], 'per_chg': [1.0, 2.0]})
+
+    results = rankings.precompute(2, gainers, empty)
+
+    assert set(results) == {big.symbol_set_hash, bank.symbol_set_hash}
+    snapshot_id, bank_gainers, _ = results[bank.symbol_set_hash]
+    assert snapshot_id == 2
+    assert bank_gainers['nsecode'].tolist() == ['B']
+    # Sessions asking afterwards read the precomputed result
+    assert rankings.get(2, bank, None, None)[0] is bank_gainers
+
+
+def test_shared_rankings_forget_the_least_recent_set():
+    rankings = SharedRankings(max_symbol_sets=1)
+    empty = pd.DataFrame({'nsecode': [], 'per_chg': []})
+    rankings.get(1, SymbolIndex(['A']), empty, empty)
+    latest = SymbolIndex(['B'])
+    rankings.get(1, latest, empty, empty)
+
+    assert set(rankings.precompute(2, empty, empty)) == {latest.symbol_set_hash}
@@ -0,0 +1,57 @@
+import pandas as pd
+
+from stock_ranking import split_by_index
+from symbol_index import IndexMembership, SymbolIndex, load_index_membership
+
+
+def membership_of(**indices):
+    membership = IndexMembership()
+    for name, symbols in indices.items():
+        membership.add(name, SymbolIndex(symbols))
+    return membership
+
+
+def test_mask_series_sets_one_bit_per_index():
+    membership = membership_of(big=['A', 'B'], bank=['B', 'C'])
+
+    masks = membership.mask_series(pd.Series(['A', 'B', 'C', 'Z']))
+
+    assert masks.tolist() == [1, 3, 2, 0]
+    assert membership.bit('bank') == 2
+
+
+def test_symbol_index_matches_chartink_aliases():
+    index = SymbolIndex(['BAJAJ-AUTO'])
+    assert 'BAJAJ-AUTO' in index
+    assert 'BAJAJAUTO' in index
+
+
+def test_split_by_index_filters_and_ranks_each_index():
+    membership = membership_of(big=['A', 'B', 'C'], bank=['B', 'C'])
+    stock_list = pd.DataFrame({
+        'nsecode': ['A', 'B', 'C', 'Z'],
+        'per_chg': ['1.5', '3.0', '2.0', '9.0'],
+    })
+
+    result = split_by_index(stock_list, membership, top_n=2)
+
+    assert result['big']['nsecode'].tolist() == ['B', 'C']
+    assert result['bank']['nsecode'].tolist() == ['B', 'C']
+    assert result['big']['per_chg'].tolist() == [3.0, 2.0]
+
+
+def test_split_by_index_empty_fetch():
+    membership = membership_of(big=['A'])
+    result = split_by_index(pd.DataFrame(), membership)
+    assert result['big'].empty
+
+
+def test_load_index_membership_reports_missing_files(tmp_path, capsys):
+    present = tmp_path / 'big.csv'
+    present.write_text('Symbol\nA\nB\n')
+    missing = tmp_path / 'bank.csv'
+
+    membership = load_index_membership({'big': str(present), 'bank': str(missing)})
+
+    assert membership.names == ['big']
+    assert f"Skipping bank: {missing} not found" in capsys.readouterr().out